@@ -1,19 +1,27 @@
+import asyncio
 from datetime import datetime
-import shutil
+import json
 from pathlib import Path
-from typing import Optional
+from typing import Literal, Optional
 
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
+from sqlalchemy import insert, update
 from sqlmodel import Session, select
 
 from app.db.database import get_session
 from app.db.models import Chapter, Download, Manga
 from app.extensions.loader import registry
+from app.services.download_events import download_events
 from app.services.download_manager import download_manager
+from app.services.download_queue import PRIORITIES, normalize_priority
 
 router = APIRouter(tags=["downloads"])
 
+SSE_KEEPALIVE_SECONDS = 15.0
+BULK_INSERT_CHUNK = 500
+
 
 class QueueDownloadRequest(BaseModel):
     manga_title: str
@@ -22,6 +30,28 @@ class QueueDownloadRequest(BaseModel):
     chapter_number: int
     chapter_url: str
     chapter_title: Optional[str] = None
+    priority: Literal["interactive", "normal", "background"] = "normal"
+
+
+class BulkQueueChapter(BaseModel):
+    chapter_number: int
+    chapter_url: str
+    chapter_title: Optional[str] = None
+
+
+class BulkQueueDownloadRequest(BaseModel):
+    manga_title: str
+    manga_url: str
+    source: str
+    chapters: Optional[list[BulkQueueChapter]] = None
+    start_chapter: Optional[float] = None
+    end_chapter: Optional[float] = None
+    priority: Literal["interactive", "normal", "background"] = "normal"
+
+
+class BulkDeleteDownloadsRequest(BaseModel):
+    download_ids: Optional[list[int]] = None
+    manga_id: Optional[int] = None
 
 
 def _normalize_source_key(raw: str) -> str:
@@ -47,9 +77,14 @@ def _normalize_source_key(raw: str) -> str:
 @router.get("")
 async def list_downloads(db: Session = Depends(get_session)):
     downloads = db.exec(select(Download).order_by(Download.created_at.desc())).all()
+    manga_ids = {dl.manga_id for dl in downloads}
+    mangas = {
+        manga.id: manga
+        for manga in db.exec(select(Manga).where(Manga.id.in_(list(manga_ids)))).all()
+    } if manga_ids else {}
     items = []
     for dl in downloads:
-        manga = db.get(Manga, dl.manga_id)
+        manga = mangas.get(dl.manga_id)
         items.append(
             {
                 "id": dl.id,
@@ -60,11 +95,14 @@ async def list_downloads(db: Session = Depends(get_session)):
                 "chapter_url": dl.chapter_url,
                 "source": dl.source,
                 "status": dl.status,
+                "priority": dl.priority,
                 "progress": dl.progress,
                 "error": dl.error,
                 "file_path": dl.file_path,
                 "total_pages": dl.total_pages,
                 "downloaded_pages": dl.downloaded_pages,
+                "failed_pages": json.loads(dl.failed_pages) if dl.failed_pages else [],
+                "bytes_saved": dl.bytes_saved,
                 "created_at": dl.created_at,
                 "updated_at": dl.updated_at,
             }
@@ -72,21 +110,123 @@ async def list_downloads(db: Session = Depends(get_session)):
     return {"downloads": items}
 
 
-@router.post("/queue")
-async def queue_download(payload: QueueDownloadRequest, db: Session = Depends(get_session)):
-    normalized_source = _normalize_source_key(payload.source)
-
-    manga = db.exec(select(Manga).where(Manga.url == payload.manga_url)).first()
+def _get_or_create_manga(db: Session, *, title: str, url: str, source: str) -> Manga:
+    manga = db.exec(select(Manga).where(Manga.url == url)).first()
     if not manga:
         manga = Manga(
-            title=payload.manga_title,
-            url=payload.manga_url,
-            source=normalized_source,
+            title=title,
+            url=url,
+            source=source,
             created_at=datetime.utcnow(),
             updated_at=datetime.utcnow(),
         )
         db.add(manga)
         db.flush()
+    return manga
+
+
+async def _chapters_in_range(
+    payload: BulkQueueDownloadRequest, source: str
+) -> tuple[list[BulkQueueChapter], list[float]]:
+    """Chapters of the range, plus the fractional numbers that were left out.
+
+    Downloads are keyed by whole chapter numbers, so a 10.5 cannot be
+    queued without colliding with chapter 10.
+    """
+    if payload.start_chapter is None and payload.end_chapter is None:
+        raise HTTPException(status_code=400, detail="Provide chapters or a chapter range")
+    try:
+        scraper = registry.get(source)
+    except KeyError:
+        raise HTTPException(status_code=404, detail=f"Source {payload.source} not found")
+
+    start = payload.start_chapter if payload.start_chapter is not None else float("-inf")
+    end = payload.end_chapter if payload.end_chapter is not None else float("inf")
+    selected: list[BulkQueueChapter] = []
+    skipped: list[float] = []
+    for chapter in await scraper.chapters(payload.manga_url):
+        number = chapter.chapter_number
+        if number is None or not start <= number <= end:
+            continue
+        if not float(number).is_integer():
+            skipped.append(number)
+            continue
+        selected.append(
+            BulkQueueChapter(
+                chapter_number=int(number),
+                chapter_url=chapter.url,
+                chapter_title=chapter.title,
+            )
+        )
+    return selected, sorted(skipped)
+
+
+@router.get("/events")
+async def stream_download_events(request: Request):
+    """
+    Server-Sent Events stream of download progress and state changes.
+
+    Events are pushed by the download manager as they happen, so clients
+    only need the full list once and can patch it from these deltas.
+    """
+    queue = download_events.subscribe()
+
+    async def event_stream():
+        try:
+            yield "retry: 3000\n\n"
+            while not await request.is_disconnected():
+                try:
+                    event = await asyncio.wait_for(queue.get(), timeout=SSE_KEEPALIVE_SECONDS)
+                except asyncio.TimeoutError:
+                    yield ": keep-alive\n\n"
+                    continue
+                yield f"event: {event['type']}\ndata: {json.dumps(event, default=str)}\n\n"
+        finally:
+            download_events.unsubscribe(queue)
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@router.get("/metrics")
+async def get_download_metrics():
+    """
+    Rolling download timings: page resolve, TTFB, transfer and disk time,
+    per-host throughput and recent chapters, next to the current pool sizes.
+    """
+    return {
+        **download_manager.metrics.summary(),
+        "pool": {
+            "max_concurrent": download_manager.max_concurrent,
+            "active": len(download_manager.active_downloads),
+            "queued": download_manager.queue.qsize(),
+            "running_per_source": download_manager.queue.running_per_source(),
+        },
+    }
+
+
+@router.get("/storage")
+async def get_download_storage():
+    """
+    Space used under the downloads root against the configured quota, and
+    the running average page size used to estimate new chapters.
+    """
+    return await asyncio.to_thread(download_manager.storage_report)
+
+
+@router.post("/queue")
+async def queue_download(payload: QueueDownloadRequest, db: Session = Depends(get_session)):
+    normalized_source = _normalize_source_key(payload.source)
+
+    manga = _get_or_create_manga(
+        db,
+        title=payload.manga_title,
+        url=payload.manga_url,
+        source=normalized_source,
+    )
 
     existing = db.exec(
         select(Download).where(
@@ -96,6 +236,13 @@ async def queue_download(payload: QueueDownloadRequest, db: Session = Depends(ge
         )
     ).first()
     if existing:
+        if PRIORITIES.index(payload.priority) < PRIORITIES.index(normalize_priority(existing.priority)):
+            existing.priority = payload.priority
+            existing.updated_at = datetime.utcnow()
+            db.add(existing)
+            db.commit()
+            if existing.status == "pending":
+                await download_manager.enqueue(existing.id, existing.priority, existing.source)
         return {"ok": True, "download_id": existing.id, "message": "Already queued"}
 
     download = Download(
@@ -105,6 +252,7 @@ async def queue_download(payload: QueueDownloadRequest, db: Session = Depends(ge
         chapter_title=payload.chapter_title,
         source=normalized_source,
         status="pending",
+        priority=payload.priority,
         progress=0.0,
         created_at=datetime.utcnow(),
         updated_at=datetime.utcnow(),
@@ -112,10 +260,97 @@ async def queue_download(payload: QueueDownloadRequest, db: Session = Depends(ge
     db.add(download)
     db.commit()
     db.refresh(download)
-    await download_manager.enqueue(download.id)
+    await download_manager.enqueue(download.id, download.priority, download.source)
     return {"ok": True, "download_id": download.id}
 
 
+@router.post("/queue/bulk")
+async def queue_downloads_bulk(payload: BulkQueueDownloadRequest, db: Session = Depends(get_session)):
+    normalized_source = _normalize_source_key(payload.source)
+    skipped: list[float] = []
+    if payload.chapters is not None:
+        chapters = payload.chapters
+    else:
+        chapters, skipped = await _chapters_in_range(payload, normalized_source)
+
+    by_number: dict[int, BulkQueueChapter] = {}
+    for chapter in chapters:
+        by_number.setdefault(chapter.chapter_number, chapter)
+    if not by_number:
+        return {"ok": True, "download_ids": [], "already_queued": [], "skipped_chapters": skipped}
+
+    manga = _get_or_create_manga(
+        db,
+        title=payload.manga_title,
+        url=payload.manga_url,
+        source=normalized_source,
+    )
+
+    existing = db.exec(
+        select(Download).where(
+            Download.manga_id == manga.id,
+            Download.chapter_number.in_(list(by_number)),
+            Download.status.in_(["pending", "downloading", "paused"]),
+        )
+    ).all()
+    existing_numbers = {dl.chapter_number for dl in existing}
+
+    now = datetime.utcnow()
+    rows = [
+        {
+            "manga_id": manga.id,
+            "chapter_number": number,
+            "chapter_url": chapter.chapter_url,
+            "chapter_title": chapter.chapter_title,
+            "source": normalized_source,
+            "status": "pending",
+            "priority": payload.priority,
+            "progress": 0.0,
+            "created_at": now,
+            "updated_at": now,
+        }
+        for number, chapter in sorted(by_number.items())
+        if number not in existing_numbers
+    ]
+    ids_by_number: dict[int, int] = {}
+    # One multi-row INSERT per chunk; SQLite caps the bound parameters.
+    for offset in range(0, len(rows), BULK_INSERT_CHUNK):
+        inserted = db.exec(
+            insert(Download)
+            .values(rows[offset:offset + BULK_INSERT_CHUNK])
+            .returning(Download.chapter_number, Download.id)
+        )
+        ids_by_number.update(inserted.all())
+
+    # Like POST /queue, asking again at a higher priority raises it.
+    raised = [
+        dl
+        for dl in existing
+        if PRIORITIES.index(payload.priority) < PRIORITIES.index(normalize_priority(dl.priority))
+    ]
+    already_queued = [dl.id for dl in existing]
+    requeue = [(dl.id, dl.source) for dl in raised if dl.status == "pending"]
+    if raised:
+        db.exec(
+            update(Download)
+            .where(Download.id.in_([dl.id for dl in raised]))
+            .values(priority=payload.priority, updated_at=now)
+        )
+    db.commit()
+
+    download_ids = [ids_by_number[row["chapter_number"]] for row in rows]
+    for download_id in download_ids:
+        await download_manager.enqueue(download_id, payload.priority, normalized_source)
+    for download_id, source in requeue:
+        await download_manager.enqueue(download_id, payload.priority, source)
+    return {
+        "ok": True,
+        "download_ids": download_ids,
+        "already_queued": already_queued,
+        "skipped_chapters": skipped,
+    }
+
+
 @router.post("/{download_id}/pause")
 async def pause_download(download_id: int, db: Session = Depends(get_session)):
     download = db.get(Download, download_id)
@@ -143,36 +378,63 @@ async def cancel_download(download_id: int, db: Session = Depends(get_session)):
     return {"ok": True}
 
 
+def _delete_downloads(db: Session, downloads: list[Download]) -> list[int]:
+    """Drop the rows in one transaction and hand their files to the manager."""
+    if not downloads:
+        return []
+    keys = {(dl.manga_id, dl.chapter_number) for dl in downloads}
+    chapters = db.exec(
+        select(Chapter).where(
+            Chapter.manga_id.in_({manga_id for manga_id, _ in keys}),
+            Chapter.chapter_number.in_({number for _, number in keys}),
+        )
+    ).all()
+    now = datetime.utcnow()
+    for chapter in chapters:
+        if (chapter.manga_id, chapter.chapter_number) in keys:
+            chapter.is_downloaded = False
+            chapter.downloaded_path = None
+            chapter.updated_at = now
+            db.add(chapter)
+
+    download_ids = [dl.id for dl in downloads]
+    paths = [Path(dl.file_path) for dl in downloads if dl.file_path]
+    for dl in downloads:
+        db.delete(dl)
+    db.commit()
+
+    download_manager.remove_files(download_ids, paths)
+    for download_id in download_ids:
+        download_events.publish("deleted", download_id)
+    return download_ids
+
+
+@router.post("/delete")
+async def delete_downloads(payload: BulkDeleteDownloadsRequest, db: Session = Depends(get_session)):
+    """
+    Delete many downloads at once, by id or for a whole manga.
+
+    Rows are removed straight away and the files are deleted in the
+    background, so the response does not wait on the disk.
+    """
+    if not payload.download_ids and payload.manga_id is None:
+        raise HTTPException(status_code=400, detail="Provide download_ids or manga_id")
+
+    query = select(Download)
+    if payload.download_ids:
+        query = query.where(Download.id.in_(payload.download_ids))
+    if payload.manga_id is not None:
+        query = query.where(Download.manga_id == payload.manga_id)
+    deleted = _delete_downloads(db, list(db.exec(query).all()))
+    return {"ok": True, "deleted": deleted}
+
+
 @router.delete("/{download_id}/files")
 async def delete_download_files(download_id: int, db: Session = Depends(get_session)):
     download = db.get(Download, download_id)
     if not download:
         raise HTTPException(status_code=404, detail="Download not found")
 
-    await download_manager.cancel(download_id)
-
-    deleted_files = False
-    if download.file_path:
-        target = Path(download.file_path)
-        try:
-            if target.exists() and target.is_dir():
-                shutil.rmtree(target)
-                deleted_files = True
-        except Exception as exc:
-            raise HTTPException(status_code=500, detail=f"Failed to delete files: {exc}")
-
-    chapter = db.exec(
-        select(Chapter).where(
-            Chapter.manga_id == download.manga_id,
-            Chapter.chapter_number == download.chapter_number,
-        )
-    ).first()
-    if chapter:
-        chapter.is_downloaded = False
-        chapter.downloaded_path = None
-        chapter.updated_at = datetime.utcnow()
-        db.add(chapter)
-
-    db.delete(download)
-    db.commit()
-    return {"ok": True, "deleted_files": deleted_files}
+    has_files = bool(download.file_path) and Path(download.file_path).exists()
+    _delete_downloads(db, [download])
+    return {"ok": True, "deleted_files": has_files}
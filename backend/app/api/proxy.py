@@ -10,20 +10,21 @@ from sqlmodel import Session, select
 from app.api.manga import _pick_source
 from app.db.database import engine
 from app.db.models import Setting
-from app.services.image_cache import DiskImageCache, build_default_cache_dir
+from app.services.download_manager import download_manager
+from app.services.image_cache import image_cache
 
 router = APIRouter()
 
-image_cache = DiskImageCache(build_default_cache_dir())
 
-
-def _get_cache_settings() -> tuple[bool, int, int]:
+def _get_cache_settings() -> tuple[bool, int, int, int]:
     enabled = True
     max_bytes = 536870912
+    memory_max_bytes = 67108864
     ttl_hours = 720
     keys = {
         "images.cache.enabled",
         "images.cache.max_bytes",
+        "images.cache.memory_max_bytes",
         "images.cache.ttl_hours",
     }
 
@@ -40,10 +41,12 @@ def _get_cache_settings() -> tuple[bool, int, int]:
             enabled = bool(parsed)
         elif row.key == "images.cache.max_bytes":
             max_bytes = int(parsed)
+        elif row.key == "images.cache.memory_max_bytes":
+            memory_max_bytes = int(parsed)
         elif row.key == "images.cache.ttl_hours":
             ttl_hours = int(parsed)
 
-    return enabled, max_bytes, ttl_hours
+    return enabled, max_bytes, memory_max_bytes, ttl_hours
 
 
 def _build_referer_candidates(url: str, source_referer: str | None) -> list[str]:
@@ -79,11 +82,16 @@ async def proxy_image(
     """
     Proxy an image request through the backend to attach correct headers (Referer, User-Agent).
     """
-    enabled, max_bytes, ttl_hours = _get_cache_settings()
+    enabled, max_bytes, memory_max_bytes, ttl_hours = _get_cache_settings()
     use_cache = cache and enabled and max_bytes > 0 and ttl_hours > 0
 
     if use_cache:
-        cached = image_cache.get(url=url, source=source, ttl_hours=ttl_hours)
+        cached = await image_cache.aget(
+            url=url,
+            source=source,
+            ttl_hours=ttl_hours,
+            memory_max_bytes=memory_max_bytes,
+        )
         if cached:
             return Response(
                 content=cached.content,
@@ -112,6 +120,8 @@ async def proxy_image(
                 source_referer = None
 
         referer_candidates = _build_referer_candidates(url, source_referer)
+        # Let background downloads back off while the reader needs the link.
+        download_manager.bandwidth.note_interactive()
 
         async with httpx.AsyncClient(timeout=10.0, follow_redirects=True) as client:
             last_error: Exception | None = None
@@ -136,13 +146,14 @@ async def proxy_image(
                         media_type = response.headers.get("content-type", "image/jpeg")
 
                         if use_cache:
-                            image_cache.put(
+                            await image_cache.aput(
                                 url=url,
                                 source=source,
                                 content=content,
                                 content_type=media_type,
                                 max_bytes=max_bytes,
                                 ttl_hours=ttl_hours,
+                                memory_max_bytes=memory_max_bytes,
                             )
 
                         return Response(
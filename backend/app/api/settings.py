@@ -9,6 +9,7 @@ from sqlmodel import Session, select
 
 from app.db.database import get_session
 from app.db.models import Setting
+from app.services.download_manager import download_manager
 
 router = APIRouter(tags=["settings"])
 
@@ -20,12 +21,26 @@ class SettingUpdate(BaseModel):
 
 DEFAULTS = {
     "downloads.max_concurrent": 2,
+    "downloads.per_source_concurrency": 2,
+    "downloads.page_concurrency": 4,
+    "downloads.page_retries": 3,
+    "downloads.http.max_connections_per_host": 6,
+    "downloads.http.keepalive_seconds": 30,
+    "downloads.http.http2": False,
+    "downloads.bandwidth.max_bytes_per_sec": 0,
+    "downloads.bandwidth.schedule": [],
+    "downloads.bandwidth.interactive_share": 0.25,
     "downloads.path": str((Path(os.getenv("DATA_DIR", "./data")) / "downloads").resolve()),
+    "downloads.format": "folder",
+    "downloads.quota_bytes": 0,
+    "downloads.transcode.mode": "off",
+    "downloads.transcode.webp_quality": 80,
     "updates.interval_minutes": 60,
     "reader.default_mode": "single",
     "reader.reading_direction": "ltr",
     "images.cache.enabled": True,
     "images.cache.max_bytes": 536870912,
+    "images.cache.memory_max_bytes": 67108864,
     "images.cache.ttl_hours": 720,
 }
 
@@ -64,4 +79,13 @@ async def set_setting(payload: SettingUpdate, db: Session = Depends(get_session)
     else:
         db.add(Setting(key=payload.key, value=value))
     db.commit()
+
+    if payload.key == "downloads.max_concurrent":
+        download_manager.set_max_concurrent(value_to_store)
+    elif payload.key == "downloads.per_source_concurrency":
+        download_manager.set_source_concurrency(value_to_store)
+    elif payload.key.startswith("downloads.http."):
+        download_manager.configure_http()
+    elif payload.key.startswith("downloads.bandwidth."):
+        download_manager.configure_bandwidth()
     return {"ok": True}
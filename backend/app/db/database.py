@@ -34,6 +34,11 @@ def _ensure_download_columns():
         "error": "TEXT",
         "total_pages": "INTEGER NOT NULL DEFAULT 0",
         "downloaded_pages": "INTEGER NOT NULL DEFAULT 0",
+        "failed_pages": "TEXT",
+        "bytes_saved": "INTEGER NOT NULL DEFAULT 0",
+        "priority": "TEXT NOT NULL DEFAULT 'normal'",
+        "lease_owner": "TEXT",
+        "lease_expires_at": "DATETIME",
     }
 
     inspector = inspect(engine)
@@ -80,11 +80,16 @@ class Download(SQLModel, table=True):
     chapter_title: Optional[str] = None
     source: Optional[str] = None
     status: str = "pending"
+    priority: str = "normal"
     progress: float = 0.0
     file_path: Optional[str] = None
     error: Optional[str] = None
     total_pages: int = 0
     downloaded_pages: int = 0
+    failed_pages: Optional[str] = None
+    bytes_saved: int = 0
+    lease_owner: Optional[str] = None
+    lease_expires_at: Optional[datetime] = None
     created_at: datetime = Field(default_factory=datetime.utcnow)
     updated_at: datetime = Field(default_factory=datetime.utcnow)
 
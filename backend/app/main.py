@@ -3,6 +3,7 @@ import os
 import sys
 import argparse
 import logging
+import multiprocessing
 from datetime import datetime
 import uvicorn
 from fastapi import FastAPI
@@ -22,6 +23,7 @@ from app.api import (
     settings_router,
 )
 from app.services.download_manager import download_manager
+from app.services.image_cache import image_cache
 
 # Global data directory that can be set via command line or environment
 DATA_DIR = os.environ.get("PYYOMI_DATA_DIR", "./data")
@@ -71,6 +73,9 @@ if __name__ != "__main__":
     # When imported by uvicorn, use environment variable or default
     args = type('Args', (), {'data_dir': DATA_DIR, 'port': 8000})()
 else:
+    # Spawned transcode workers of the frozen desktop build start by running
+    # this module; hand them over before their arguments reach argparse.
+    multiprocessing.freeze_support()
     # Parse command line arguments when running directly
     parser = argparse.ArgumentParser()
     parser.add_argument("--port", type=int, default=8000)
@@ -146,11 +151,13 @@ def create_app() -> FastAPI:
     async def startup_event():
         await download_manager.start()
         logger.info("Download manager started")
+        await image_cache.start()
 
     @app.on_event("shutdown")
     async def shutdown_event():
         await download_manager.stop()
         logger.info("Download manager stopped")
+        await image_cache.stop()
     
     @app.get("/")
     async def root():
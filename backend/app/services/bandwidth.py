@@ -0,0 +1,119 @@
+import asyncio
+from dataclasses import dataclass, field
+from datetime import datetime, time as dt_time
+from time import monotonic
+from typing import Any, Optional
+
+# While the reader is pulling images through the proxy, background downloads
+# drop to this share of their budget, and stay there this long after the last
+# proxied request.
+DEFAULT_INTERACTIVE_SHARE = 0.25
+INTERACTIVE_HOLD_SECONDS = 5.0
+# Unlimited downloads still yield this much when the reader is active.
+INTERACTIVE_FALLBACK_BYTES_PER_SEC = 512 * 1024
+
+
+@dataclass
+class BandwidthWindow:
+    start: dt_time
+    end: dt_time
+    max_bytes_per_sec: int
+
+    def contains(self, moment: dt_time) -> bool:
+        if self.start <= self.end:
+            return self.start <= moment < self.end
+        # Windows such as 22:00-06:00 wrap around midnight.
+        return moment >= self.start or moment < self.end
+
+
+@dataclass
+class BandwidthConfig:
+    max_bytes_per_sec: int = 0
+    schedule: list[BandwidthWindow] = field(default_factory=list)
+    interactive_share: float = DEFAULT_INTERACTIVE_SHARE
+
+    @classmethod
+    def from_settings(
+        cls,
+        max_bytes_per_sec: Any,
+        schedule: Any,
+        interactive_share: Any,
+    ) -> "BandwidthConfig":
+        windows: list[BandwidthWindow] = []
+        for item in schedule if isinstance(schedule, list) else []:
+            try:
+                windows.append(
+                    BandwidthWindow(
+                        start=dt_time.fromisoformat(str(item["start"])),
+                        end=dt_time.fromisoformat(str(item["end"])),
+                        max_bytes_per_sec=max(0, int(item["max_bytes_per_sec"])),
+                    )
+                )
+            except (KeyError, TypeError, ValueError):
+                continue
+        try:
+            limit = max(0, int(max_bytes_per_sec or 0))
+        except (TypeError, ValueError):
+            limit = 0
+        try:
+            share = min(max(float(interactive_share), 0.0), 1.0)
+        except (TypeError, ValueError):
+            share = DEFAULT_INTERACTIVE_SHARE
+        return cls(max_bytes_per_sec=limit, schedule=windows, interactive_share=share)
+
+
+class BandwidthLimiter:
+    """Token bucket shared by every download transfer.
+
+    The rate is the configured ceiling, replaced by the first matching
+    schedule window, and scaled down while the image proxy is serving the
+    reader. A rate of 0 means unlimited.
+    """
+
+    def __init__(self, config: Optional[BandwidthConfig] = None) -> None:
+        self.config = config or BandwidthConfig()
+        self._tokens = 0.0
+        self._updated_at = monotonic()
+        self._interactive_until = 0.0
+        self._lock = asyncio.Lock()
+
+    def configure(self, config: BandwidthConfig) -> None:
+        self.config = config
+
+    def note_interactive(self) -> None:
+        self._interactive_until = monotonic() + INTERACTIVE_HOLD_SECONDS
+
+    def current_rate(self, now: Optional[datetime] = None) -> float:
+        moment = (now or datetime.now()).time()
+        rate = float(self.config.max_bytes_per_sec)
+        for window in self.config.schedule:
+            if window.contains(moment):
+                rate = float(window.max_bytes_per_sec)
+                break
+
+        if monotonic() < self._interactive_until:
+            if rate <= 0:
+                rate = INTERACTIVE_FALLBACK_BYTES_PER_SEC
+            rate *= self.config.interactive_share
+            rate = max(rate, 1.0)
+        return rate
+
+    async def consume(self, amount: int) -> None:
+        if amount <= 0:
+            return
+        async with self._lock:
+            while True:
+                rate = self.current_rate()
+                if rate <= 0:
+                    return
+                now = monotonic()
+                # Allow at most one second of burst.
+                self._tokens = min(self._tokens + (now - self._updated_at) * rate, rate)
+                self._updated_at = now
+                if self._tokens >= amount or self._tokens >= rate:
+                    self._tokens -= amount
+                    return
+                missing = min(amount, rate) - self._tokens
+                # Re-check at least every second so schedule changes and
+                # proxy activity take effect mid-wait.
+                await asyncio.sleep(min(missing / rate, 1.0))
@@ -0,0 +1,150 @@
+import contextlib
+import hashlib
+import os
+import shutil
+import threading
+from pathlib import Path
+from typing import Optional
+
+HASH_CHUNK_SIZE = 1024 * 1024
+
+
+class BlobStore:
+    """Content-addressed files shared by hard links.
+
+    A blob lives at ``<root>/<aa>/<bb>/<sha256>``. Every other copy of the
+    content, such as an image cache entry or a downloaded page, is a hard link
+    to that file, so the link count doubles as the reference count: once a
+    blob's own name is the only one left, nothing uses it and it is removed.
+    Targets on another filesystem, or on one without hard links, get a plain
+    copy instead and are not tracked.
+    """
+
+    def __init__(self, root: Path) -> None:
+        self.root = root
+        self._lock = threading.Lock()
+
+    def path_for(self, digest: str) -> Path:
+        return self.root / digest[:2] / digest[2:4] / digest
+
+    def add_bytes(self, content: bytes, target: Path) -> Optional[str]:
+        """Write ``content`` to ``target`` through the store; returns the digest."""
+        if not self._shares_device(target.parent):
+            _write_atomic(target, content)
+            return None
+        digest = hashlib.sha256(content).hexdigest()
+        blob = self.path_for(digest)
+        with self._lock:
+            if not blob.exists():
+                _write_atomic(blob, content)
+            if not self._link(blob, target):
+                _write_atomic(target, content)
+                self._drop_if_unused(blob)
+                return None
+        return digest
+
+    def add_file(self, source: Path, target: Path) -> Optional[str]:
+        """Move ``source`` to ``target`` through the store; returns the digest."""
+        if not self._shares_device(target.parent):
+            os.replace(source, target)
+            return None
+        digest = _hash_file(source)
+        blob = self.path_for(digest)
+        with self._lock:
+            if not blob.exists():
+                blob.parent.mkdir(parents=True, exist_ok=True)
+                os.replace(source, blob)
+            if not self._link(blob, target):
+                if source.exists():
+                    os.replace(source, target)
+                else:
+                    shutil.copyfile(blob, target)
+                self._drop_if_unused(blob)
+                return None
+            source.unlink(missing_ok=True)
+        return digest
+
+    def release(self, path: Path, digest: Optional[str] = None) -> None:
+        """Remove ``path`` and the blob behind it if that was its last user."""
+        try:
+            linked = path.stat().st_nlink > 1
+        except FileNotFoundError:
+            return
+        if linked and digest is None:
+            digest = _hash_file(path)
+        with self._lock:
+            path.unlink(missing_ok=True)
+            if digest:
+                self._drop_if_unused(self.path_for(digest))
+
+    def references(self, path: Path) -> int:
+        """How many names besides the store's own share the blob behind ``path``."""
+        try:
+            return max(path.stat().st_nlink - 1, 0)
+        except FileNotFoundError:
+            return 0
+
+    def collect(self) -> int:
+        """Delete blobs nothing links to any more; returns how many went."""
+        removed = 0
+        if not self.root.exists():
+            return removed
+        for blob in self.root.glob("*/*/*"):
+            with self._lock:
+                if self._drop_if_unused(blob):
+                    removed += 1
+        return removed
+
+    def _shares_device(self, directory: Path) -> bool:
+        self.root.mkdir(parents=True, exist_ok=True)
+        try:
+            return os.stat(directory).st_dev == os.stat(self.root).st_dev
+        except OSError:
+            return False
+
+    def _link(self, blob: Path, target: Path) -> bool:
+        temp = target.with_name(f".{target.name}.link")
+        try:
+            temp.unlink(missing_ok=True)
+            os.link(blob, temp)
+            os.replace(temp, target)
+            # Renaming onto another link to the same inode is a no-op that
+            # leaves ``temp`` in place, e.g. when ``target`` already used it.
+            temp.unlink(missing_ok=True)
+            return True
+        except OSError:
+            with contextlib.suppress(OSError):
+                temp.unlink(missing_ok=True)
+            return False
+
+    def _drop_if_unused(self, blob: Path) -> bool:
+        try:
+            if blob.stat().st_nlink > 1:
+                return False
+            blob.unlink()
+            return True
+        except FileNotFoundError:
+            return False
+
+
+def _hash_file(path: Path) -> str:
+    digest = hashlib.sha256()
+    with path.open("rb") as handle:
+        for chunk in iter(lambda: handle.read(HASH_CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _write_atomic(path: Path, content: bytes) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    temp = path.with_name(f".{path.name}.tmp")
+    temp.write_bytes(content)
+    os.replace(temp, path)
+
+
+def build_default_blob_dir() -> Path:
+    data_dir = Path(os.getenv("DATA_DIR", "./data"))
+    return data_dir / "blobs"
+
+
+blob_store = BlobStore(build_default_blob_dir())
@@ -0,0 +1,35 @@
+import asyncio
+from typing import Any
+
+SUBSCRIBER_QUEUE_SIZE = 512
+
+
+class DownloadEventHub:
+    """Fans download progress and state changes out to live subscribers.
+
+    Each subscriber gets its own bounded queue. A subscriber that falls
+    behind loses its oldest events rather than slowing downloads down.
+    """
+
+    def __init__(self) -> None:
+        self._subscribers: set[asyncio.Queue] = set()
+
+    def subscribe(self) -> asyncio.Queue:
+        queue: asyncio.Queue = asyncio.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+        self._subscribers.add(queue)
+        return queue
+
+    def unsubscribe(self, queue: asyncio.Queue) -> None:
+        self._subscribers.discard(queue)
+
+    def publish(self, event_type: str, download_id: int, **fields: Any) -> None:
+        if not self._subscribers:
+            return
+        event = {"type": event_type, "id": download_id, **fields}
+        for queue in list(self._subscribers):
+            if queue.full():
+                queue.get_nowait()
+            queue.put_nowait(event)
+
+
+download_events = DownloadEventHub()
@@ -0,0 +1,102 @@
+import asyncio
+import contextlib
+import importlib.util
+from dataclasses import dataclass
+from typing import Optional
+from urllib.parse import urlsplit
+
+import httpx
+
+DEFAULT_MAX_CONNECTIONS_PER_HOST = 6
+DEFAULT_KEEPALIVE_SECONDS = 30.0
+DEFAULT_TIMEOUT_SECONDS = 30.0
+
+
+@dataclass(frozen=True)
+class HttpPoolConfig:
+    max_connections_per_host: int = DEFAULT_MAX_CONNECTIONS_PER_HOST
+    keepalive_seconds: float = DEFAULT_KEEPALIVE_SECONDS
+    http2: bool = False
+    timeout: float = DEFAULT_TIMEOUT_SECONDS
+
+
+class DownloadHttpClient:
+    """Long-lived HTTP clients for page downloads, one pool per host.
+
+    httpx only limits connections per client, so each scheme/host pair gets
+    its own ``AsyncClient``. Back-to-back chapters from the same CDN then
+    reuse warm keep-alive connections instead of new TLS handshakes.
+    """
+
+    def __init__(
+        self,
+        config: Optional[HttpPoolConfig] = None,
+        *,
+        transport: Optional[httpx.AsyncBaseTransport] = None,
+    ) -> None:
+        self.config = config or HttpPoolConfig()
+        self._transport = transport
+        self._clients: dict[str, httpx.AsyncClient] = {}
+        self._retired: list[httpx.AsyncClient] = []
+        self._closing: set[asyncio.Task] = set()
+
+    def configure(self, config: HttpPoolConfig) -> None:
+        if config == self.config:
+            return
+        self.config = config
+        # Requests already in flight keep their client; it is closed once
+        # they have had time to finish.
+        retired = list(self._clients.values())
+        self._clients.clear()
+        if retired:
+            self._retired.extend(retired)
+            task = asyncio.get_running_loop().create_task(self._close_later(retired))
+            self._closing.add(task)
+            task.add_done_callback(self._closing.discard)
+
+    def client_for(self, url: str) -> httpx.AsyncClient:
+        parts = urlsplit(url)
+        host_key = f"{parts.scheme}://{parts.netloc}".lower()
+        client = self._clients.get(host_key)
+        if client is None or client.is_closed:
+            client = self._build_client()
+            self._clients[host_key] = client
+        return client
+
+    async def aclose(self) -> None:
+        clients = [*self._clients.values(), *self._retired]
+        self._clients.clear()
+        self._retired.clear()
+        for task in list(self._closing):
+            task.cancel()
+        for client in clients:
+            with contextlib.suppress(Exception):
+                await client.aclose()
+
+    def _build_client(self) -> httpx.AsyncClient:
+        limits = httpx.Limits(
+            max_connections=self.config.max_connections_per_host,
+            max_keepalive_connections=self.config.max_connections_per_host,
+            keepalive_expiry=self.config.keepalive_seconds,
+        )
+        return httpx.AsyncClient(
+            timeout=self.config.timeout,
+            follow_redirects=True,
+            limits=limits,
+            http2=self.config.http2 and _http2_available(),
+            transport=self._transport,
+        )
+
+    async def _close_later(self, clients: list[httpx.AsyncClient]) -> None:
+        await asyncio.sleep(self.config.timeout)
+        for client in clients:
+            if client in self._retired:
+                self._retired.remove(client)
+            with contextlib.suppress(Exception):
+                await client.aclose()
+
+
+def _http2_available() -> bool:
+    # HTTP/2 needs the optional "h2" package (httpx[http2]); without it the
+    # pool quietly stays on HTTP/1.1.
+    return importlib.util.find_spec("h2") is not None
@@ -1,28 +1,89 @@
 import asyncio
 import contextlib
 import json
+import logging
 import os
+import random
 import re
-from datetime import datetime
+import shutil
+import uuid
+from datetime import datetime, timedelta, timezone
+from email.utils import parsedate_to_datetime
 from pathlib import Path
-from typing import Any, Optional
-from urllib.parse import urlparse
+from time import monotonic
+from typing import Any, Callable, Optional
+from urllib.parse import urlparse, urlsplit
 
 import httpx
+from sqlalchemy import or_, update
 from sqlmodel import Session, select
 
 from app.db.database import engine
 from app.db.models import Chapter, Download, Manga, Setting
 from app.extensions.loader import registry
+from app.services.blob_store import blob_store
+from app.services.bandwidth import DEFAULT_INTERACTIVE_SHARE, BandwidthConfig, BandwidthLimiter
+from app.services.download_events import download_events
+from app.services.download_http import (
+    DEFAULT_KEEPALIVE_SECONDS,
+    DEFAULT_MAX_CONNECTIONS_PER_HOST,
+    DownloadHttpClient,
+    HttpPoolConfig,
+)
+from app.services.download_metrics import DownloadMetrics, DownloadSample, PageSample
+from app.services.download_output import (
+    DEFAULT_OUTPUT_FORMAT,
+    CbzOutput,
+    FolderOutput,
+    normalize_output_format,
+)
+from app.services.download_progress import ProgressReporter
+from app.services.download_queue import (
+    DEFAULT_PRIORITY,
+    DEFAULT_SOURCE_CONCURRENCY,
+    DownloadQueue,
+    normalize_priority,
+)
+from app.services.download_storage import DownloadStorage, remove_download_path
+from app.services.download_transcode import DEFAULT_WEBP_QUALITY, PageTranscoder, TranscodeConfig
+
+
+DEFAULT_MAX_CONCURRENT = 2
+DEFAULT_PAGE_CONCURRENCY = 4
+RESOLVE_CONCURRENCY = 2
+DEFAULT_PAGE_RETRIES = 3
+RETRY_BASE_DELAY = 1.0
+RETRY_MAX_DELAY = 30.0
+STREAM_CHUNK_SIZE = 64 * 1024
+LEASE_SECONDS = 60
+
+logger = logging.getLogger("backend")
 
 
 class DownloadManager:
     def __init__(self) -> None:
-        self.queue: asyncio.Queue[int] = asyncio.Queue()
+        self.queue = DownloadQueue()
         self.running = False
-        self.worker_task: Optional[asyncio.Task] = None
+        self.max_concurrent = DEFAULT_MAX_CONCURRENT
+        self.workers: dict[int, asyncio.Task] = {}
+        self._next_worker_id = 0
+        self._idle_workers: set[int] = set()
+        self._retiring_workers: set[int] = set()
+        self._burst_workers: dict[int, asyncio.Task] = {}
         self.active_downloads: dict[int, asyncio.Task] = {}
+        self._removals: set[asyncio.Task] = set()
         self.paused_ids: set[int] = set()
+        self.cancelled_ids: set[int] = set()
+        # Identifies this process as the holder of download leases, so a job
+        # claimed here is never picked up a second time while it is running.
+        self.instance_id = uuid.uuid4().hex
+        self.lease_task: Optional[asyncio.Task] = None
+        self.http = DownloadHttpClient()
+        self.bandwidth = BandwidthLimiter()
+        self.metrics = DownloadMetrics()
+        self.storage = DownloadStorage()
+        self.transcoder = PageTranscoder()
+        self.blobs = blob_store
         self.data_dir = Path(os.getenv("DATA_DIR", "./data")).resolve()
         self.download_root = self.data_dir / "downloads"
         self.download_root.mkdir(parents=True, exist_ok=True)
@@ -31,19 +92,251 @@ class DownloadManager:
         if self.running:
             return
         self.running = True
-        self.worker_task = asyncio.create_task(self._worker())
+        loop = asyncio.get_running_loop()
+        self.queue.set_source_limit(self._read_source_concurrency())
+        for download_id, priority, source, delay in self._rehydrate_queue():
+            source_key = self._source_key(source)
+            if delay > 0:
+                loop.call_later(delay, self.queue.put_nowait, download_id, priority, source_key)
+            else:
+                self.queue.put_nowait(download_id, priority, source_key)
+        self.configure_http()
+        self.configure_bandwidth()
+        # Blobs orphaned while the app was down, e.g. chapter folders
+        # deleted by hand, are swept up in the background.
+        sweep = asyncio.create_task(asyncio.to_thread(self.blobs.collect))
+        self._removals.add(sweep)
+        sweep.add_done_callback(self._removals.discard)
+        self.max_concurrent = self._read_max_concurrent()
+        self._resize_workers()
+        self.lease_task = asyncio.create_task(self._renew_leases())
 
     async def stop(self) -> None:
         self.running = False
-        if self.worker_task:
-            self.worker_task.cancel()
+        if self.lease_task:
+            self.lease_task.cancel()
             with contextlib.suppress(asyncio.CancelledError):
-                await self.worker_task
-        for _, task in list(self.active_downloads.items()):
+                await self.lease_task
+            self.lease_task = None
+
+        active = list(self.active_downloads.values())
+        for task in active:
+            task.cancel()
+        workers = [*self.workers.values(), *self._burst_workers.values()]
+        for task in workers:
             task.cancel()
+        for task in [*active, *workers]:
+            with contextlib.suppress(asyncio.CancelledError):
+                await task
+        self.workers.clear()
+        self._burst_workers.clear()
+        self._idle_workers.clear()
+        self._retiring_workers.clear()
+        self._release_leases()
+        if self._removals:
+            await asyncio.gather(*self._removals, return_exceptions=True)
+        await self.http.aclose()
+        self.transcoder.shutdown()
+
+    def set_max_concurrent(self, value: Any) -> None:
+        self.max_concurrent = _coerce_max_concurrent(value)
+        if self.running:
+            self._resize_workers()
+
+    def set_source_concurrency(self, value: Any) -> None:
+        self.queue.set_source_limit(_coerce_max_concurrent(value))
+
+    def configure_http(self) -> None:
+        self.http.configure(
+            HttpPoolConfig(
+                max_connections_per_host=int(
+                    self._read_number_setting(
+                        "downloads.http.max_connections_per_host",
+                        DEFAULT_MAX_CONNECTIONS_PER_HOST,
+                        minimum=1,
+                    )
+                ),
+                keepalive_seconds=self._read_number_setting(
+                    "downloads.http.keepalive_seconds",
+                    DEFAULT_KEEPALIVE_SECONDS,
+                    minimum=0,
+                ),
+                http2=bool(self._get_setting_value("downloads.http.http2", False)),
+            )
+        )
+
+    def configure_bandwidth(self) -> None:
+        self.bandwidth.configure(
+            BandwidthConfig.from_settings(
+                max_bytes_per_sec=self._get_setting_value("downloads.bandwidth.max_bytes_per_sec", 0),
+                schedule=self._get_setting_value("downloads.bandwidth.schedule", []),
+                interactive_share=self._get_setting_value(
+                    "downloads.bandwidth.interactive_share",
+                    DEFAULT_INTERACTIVE_SHARE,
+                ),
+            )
+        )
+
+    def storage_report(self) -> dict:
+        root = self._resolve_download_root()
+        return {
+            "path": str(root),
+            "used_bytes": self.storage.usage(root),
+            "reserved_bytes": self.storage.reserved(),
+            "quota_bytes": int(self._read_number_setting("downloads.quota_bytes", 0, minimum=0)),
+            "free_bytes": shutil.disk_usage(root).free,
+            "average_page_bytes": round(self.storage.average_page_bytes),
+        }
+
+    def _read_source_concurrency(self) -> int:
+        return _coerce_max_concurrent(
+            self._get_setting_value("downloads.per_source_concurrency", DEFAULT_SOURCE_CONCURRENCY)
+        )
+
+    def _read_max_concurrent(self) -> int:
+        return _coerce_max_concurrent(
+            self._get_setting_value("downloads.max_concurrent", DEFAULT_MAX_CONCURRENT)
+        )
+
+    def _resize_workers(self) -> None:
+        self._retiring_workers.clear()
+        live = sorted(worker_id for worker_id, task in self.workers.items() if not task.done())
+        self.workers = {worker_id: self.workers[worker_id] for worker_id in live}
 
-    async def enqueue(self, download_id: int) -> None:
-        await self.queue.put(download_id)
+        while len(self.workers) < self.max_concurrent:
+            worker_id = self._next_worker_id
+            self._next_worker_id += 1
+            self.workers[worker_id] = asyncio.create_task(self._worker(worker_id))
+
+        # Shrink by retiring the newest workers; idle ones stop right away,
+        # busy ones finish their current chapter first.
+        for worker_id in sorted(self.workers)[self.max_concurrent:]:
+            if worker_id in self._idle_workers:
+                self.workers.pop(worker_id).cancel()
+                self._idle_workers.discard(worker_id)
+            else:
+                self._retiring_workers.add(worker_id)
+
+    def _rehydrate_queue(self) -> list[tuple[int, str, Optional[str], float]]:
+        """Return queued work left in the table as ``(id, priority, source, delay)``.
+
+        Rows still marked ``downloading`` were interrupted by a shutdown or
+        crash; they go back to ``pending`` and later resume from the pages
+        already on disk. Rows whose lease is still held by another process
+        are delayed until that lease expires, so they are not run twice.
+        """
+        now = datetime.utcnow()
+        with Session(engine) as db:
+            rows = db.exec(
+                select(Download)
+                .where(Download.status.in_(["pending", "downloading"]))
+                .order_by(Download.created_at)
+            ).all()
+            queued: list[tuple[int, str, Optional[str], float]] = []
+            for row in rows:
+                if row.status == "downloading":
+                    leased_elsewhere = (
+                        row.lease_owner
+                        and row.lease_owner != self.instance_id
+                        and row.lease_expires_at
+                        and row.lease_expires_at > now
+                    )
+                    if leased_elsewhere:
+                        delay = (row.lease_expires_at - now).total_seconds()
+                        queued.append((row.id, row.priority, row.source, delay))
+                        continue
+                    row.status = "pending"
+                    row.lease_owner = None
+                    row.lease_expires_at = None
+                    row.updated_at = now
+                    db.add(row)
+                queued.append((row.id, row.priority, row.source, 0.0))
+            db.commit()
+        return queued
+
+    def _claim(self, download_id: int) -> bool:
+        now = datetime.utcnow()
+        with Session(engine) as db:
+            result = db.exec(
+                update(Download)
+                .where(
+                    Download.id == download_id,
+                    Download.status.in_(["pending", "downloading"]),
+                    or_(
+                        Download.lease_owner.is_(None),
+                        Download.lease_owner == self.instance_id,
+                        Download.lease_expires_at < now,
+                    ),
+                )
+                .values(
+                    status="downloading",
+                    error=None,
+                    lease_owner=self.instance_id,
+                    lease_expires_at=now + timedelta(seconds=LEASE_SECONDS),
+                    updated_at=now,
+                )
+            )
+            db.commit()
+            return result.rowcount == 1
+
+    def _release_leases(self) -> None:
+        with Session(engine) as db:
+            db.exec(
+                update(Download)
+                .where(
+                    Download.lease_owner == self.instance_id,
+                    Download.status == "downloading",
+                )
+                .values(
+                    status="pending",
+                    lease_owner=None,
+                    lease_expires_at=None,
+                    updated_at=datetime.utcnow(),
+                )
+            )
+            db.commit()
+
+    async def _renew_leases(self) -> None:
+        while self.running:
+            await asyncio.sleep(LEASE_SECONDS / 3)
+            if not self.active_downloads:
+                continue
+            with Session(engine) as db:
+                db.exec(
+                    update(Download)
+                    .where(
+                        Download.lease_owner == self.instance_id,
+                        Download.id.in_(list(self.active_downloads)),
+                    )
+                    .values(lease_expires_at=datetime.utcnow() + timedelta(seconds=LEASE_SECONDS))
+                )
+                db.commit()
+
+    async def enqueue(
+        self,
+        download_id: int,
+        priority: str = DEFAULT_PRIORITY,
+        source: Optional[str] = None,
+    ) -> None:
+        priority = normalize_priority(priority)
+        # SQLite hands the id of a deleted newest row to the next insert, so a
+        # fresh job must not inherit the old one's cancellation.
+        self.cancelled_ids.discard(download_id)
+        self.queue.put_nowait(download_id, priority, self._source_key(source))
+        download_events.publish("queued", download_id, status="pending", priority=priority)
+        if priority == "interactive":
+            self._start_burst_worker()
+
+    def _start_burst_worker(self) -> None:
+        # An interactive job should not wait for a bulk chapter to finish, so
+        # when every pool worker is busy one extra worker serves the queue head.
+        if not self.running or self._idle_workers or self._burst_workers:
+            return
+        worker_id = self._next_worker_id
+        self._next_worker_id += 1
+        self._burst_workers[worker_id] = asyncio.create_task(
+            self._worker(worker_id, single_job=True)
+        )
 
     async def pause(self, download_id: int) -> None:
         self.paused_ids.add(download_id)
@@ -54,20 +347,27 @@ class DownloadManager:
                 dl.updated_at = datetime.utcnow()
                 db.add(dl)
                 db.commit()
+                download_events.publish("status", download_id, status="paused")
 
     async def resume(self, download_id: int) -> None:
         self.paused_ids.discard(download_id)
+        self.cancelled_ids.discard(download_id)
+        priority = DEFAULT_PRIORITY
+        source = None
         with Session(engine) as db:
             dl = db.get(Download, download_id)
             if dl:
+                priority = dl.priority
+                source = dl.source
                 dl.status = "pending"
                 dl.updated_at = datetime.utcnow()
                 db.add(dl)
                 db.commit()
-        await self.queue.put(download_id)
+        await self.enqueue(download_id, priority, source)
 
     async def cancel(self, download_id: int) -> None:
         self.paused_ids.discard(download_id)
+        self.cancelled_ids.add(download_id)
         task = self.active_downloads.pop(download_id, None)
         if task:
             task.cancel()
@@ -75,23 +375,80 @@ class DownloadManager:
             dl = db.get(Download, download_id)
             if dl:
                 dl.status = "cancelled"
+                dl.lease_owner = None
+                dl.lease_expires_at = None
                 dl.updated_at = datetime.utcnow()
                 db.add(dl)
                 db.commit()
+                download_events.publish("status", download_id, status="cancelled")
 
-    async def _worker(self) -> None:
-        while self.running:
-            download_id = await self.queue.get()
-            if download_id in self.paused_ids:
-                self.queue.task_done()
+    def remove_files(self, download_ids: list[int], paths: list[Path]) -> None:
+        """Stop the given downloads and delete their files in the background.
+
+        Returns right away; the files go once any running download among
+        them has stopped writing.
+        """
+        stopping: list[asyncio.Task] = []
+        for download_id in download_ids:
+            self.paused_ids.discard(download_id)
+            self.cancelled_ids.add(download_id)
+            task = self.active_downloads.pop(download_id, None)
+            if task:
+                task.cancel()
+                stopping.append(task)
+        removal = asyncio.create_task(self._remove_files(download_ids, stopping, paths))
+        self._removals.add(removal)
+        removal.add_done_callback(self._removals.discard)
+
+    async def _remove_files(
+        self, download_ids: list[int], stopping: list[asyncio.Task], paths: list[Path]
+    ) -> None:
+        if stopping:
+            await asyncio.wait(stopping)
+        # The rows are gone and their ids may be handed out again.
+        for download_id in download_ids:
+            self.cancelled_ids.discard(download_id)
+            self.paused_ids.discard(download_id)
+        for path in paths:
+            try:
+                freed = await asyncio.to_thread(remove_download_path, path)
+            except OSError:
+                logger.exception("Could not delete download files at %s", path)
                 continue
-            task = asyncio.create_task(self._run_download(download_id))
-            self.active_downloads[download_id] = task
+            self.storage.removed(path, freed)
+        if paths:
             try:
-                await task
-            finally:
-                self.active_downloads.pop(download_id, None)
-                self.queue.task_done()
+                await asyncio.to_thread(self.blobs.collect)
+            except OSError:
+                logger.exception("Could not sweep unused page blobs")
+
+    async def _worker(self, worker_id: int, *, single_job: bool = False) -> None:
+        try:
+            while self.running and worker_id not in self._retiring_workers:
+                self._idle_workers.add(worker_id)
+                try:
+                    download_id = await self.queue.get()
+                finally:
+                    self._idle_workers.discard(worker_id)
+                if download_id in self.paused_ids or download_id in self.active_downloads:
+                    self.queue.task_done(download_id)
+                    continue
+                task = asyncio.create_task(self._run_download(download_id))
+                self.active_downloads[download_id] = task
+                try:
+                    # wait() instead of awaiting the task so a cancelled
+                    # download does not take its worker down with it.
+                    await asyncio.wait({task})
+                finally:
+                    self.active_downloads.pop(download_id, None)
+                    self.queue.task_done(download_id)
+                if single_job:
+                    break
+        finally:
+            self._retiring_workers.discard(worker_id)
+            self._burst_workers.pop(worker_id, None)
+            if self.workers.get(worker_id) is asyncio.current_task():
+                self.workers.pop(worker_id, None)
 
     def _get_setting_value(self, key: str, default: Any) -> Any:
         with Session(engine) as db:
@@ -103,6 +460,28 @@ class DownloadManager:
         except Exception:
             return row.value
 
+    def _read_number_setting(self, key: str, default: float, *, minimum: float) -> float:
+        value = self._get_setting_value(key, default)
+        try:
+            return max(minimum, float(value))
+        except (TypeError, ValueError):
+            return default
+
+    def _read_transcode_config(self) -> TranscodeConfig:
+        return TranscodeConfig.from_settings(
+            mode=self._get_setting_value("downloads.transcode.mode", "off"),
+            webp_quality=self._get_setting_value("downloads.transcode.webp_quality", DEFAULT_WEBP_QUALITY),
+        )
+
+    def _read_page_concurrency(self) -> int:
+        return int(
+            self._read_number_setting(
+                "downloads.page_concurrency",
+                DEFAULT_PAGE_CONCURRENCY,
+                minimum=1,
+            )
+        )
+
     def _resolve_download_root(self) -> Path:
         configured = self._get_setting_value("downloads.path", str(self.download_root))
         try:
@@ -114,27 +493,34 @@ class DownloadManager:
         path.mkdir(parents=True, exist_ok=True)
         return path
 
-    def _resolve_scraper(self, source: str):
+    def _source_key(self, source: Optional[str]) -> str:
+        """Registry key for ``source``, or the cleaned name if none matches."""
         query_key = (source or "").strip().lower()
         if not query_key:
-            raise RuntimeError("Missing source")
-
-        available = registry.list_sources()
-        source_ids = {item["id"] for item in available}
+            return query_key
 
+        source_ids = {item["id"] for item in registry.list_sources()}
         if query_key in source_ids:
-            return registry.get(query_key)
+            return query_key
 
         if ":" not in query_key:
             en_key = f"{query_key}:en"
             if en_key in source_ids:
-                return registry.get(en_key)
+                return en_key
 
             for key in source_ids:
                 if key.startswith(f"{query_key}:"):
-                    return registry.get(key)
+                    return key
 
-        raise RuntimeError(f"Source {source} not found")
+        return query_key
+
+    def _resolve_scraper(self, source: str):
+        key = self._source_key(source)
+        if not key:
+            raise RuntimeError("Missing source")
+        if key not in {item["id"] for item in registry.list_sources()}:
+            raise RuntimeError(f"Source {source} not found")
+        return registry.get(key)
 
     def _slugify(self, value: Optional[str], fallback: str) -> str:
         raw = (value or "").strip().lower()
@@ -160,7 +546,14 @@ class DownloadManager:
         chapter_number: int,
         chapter_title: Optional[str],
         download_id: int,
+        existing_path: Optional[str] = None,
     ) -> Path:
+        # A resumed download keeps writing into the folder it started in.
+        if existing_path:
+            existing = Path(existing_path)
+            if existing.is_dir():
+                return existing
+
         manga_dir = root / self._slugify(manga_title, "unknown-manga")
         chapter_name = self._chapter_folder_name(chapter_number, chapter_title)
         chapter_dir = manga_dir / chapter_name
@@ -171,97 +564,409 @@ class DownloadManager:
         chapter_dir.mkdir(parents=True, exist_ok=True)
         return chapter_dir
 
+    def _resolve_archive_path(
+        self,
+        *,
+        root: Path,
+        manga_title: Optional[str],
+        chapter_number: int,
+        chapter_title: Optional[str],
+        download_id: int,
+    ) -> Path:
+        manga_dir = root / self._slugify(manga_title, "unknown-manga")
+        chapter_name = self._chapter_folder_name(chapter_number, chapter_title)
+        archive_path = manga_dir / f"{chapter_name}.cbz"
+
+        if archive_path.exists() or archive_path.with_name(f"{archive_path.name}.part").exists():
+            archive_path = manga_dir / f"{chapter_name}__{download_id}.cbz"
+        return archive_path
+
+    def _open_output(
+        self,
+        *,
+        root: Path,
+        manga_title: Optional[str],
+        chapter_number: int,
+        chapter_title: Optional[str],
+        download_id: int,
+        existing_path: Optional[str],
+    ):
+        # A resumed download keeps the format it was started with.
+        if existing_path and existing_path.endswith(".cbz"):
+            return CbzOutput(Path(existing_path))
+
+        location = {
+            "root": root,
+            "manga_title": manga_title,
+            "chapter_number": chapter_number,
+            "chapter_title": chapter_title,
+            "download_id": download_id,
+        }
+        if existing_path and Path(existing_path).is_dir():
+            return FolderOutput(
+                self._resolve_chapter_dir(**location, existing_path=existing_path),
+                blobs=self.blobs,
+            )
+
+        output_format = normalize_output_format(
+            self._get_setting_value("downloads.format", DEFAULT_OUTPUT_FORMAT)
+        )
+        if output_format == "cbz":
+            return CbzOutput(self._resolve_archive_path(**location))
+        return FolderOutput(self._resolve_chapter_dir(**location), blobs=self.blobs)
+
+    def _check_interrupted(self, download_id: int) -> None:
+        if download_id in self.cancelled_ids:
+            raise _DownloadInterrupted("cancelled")
+        if download_id in self.paused_ids:
+            raise _DownloadInterrupted("paused")
+
+    async def _stream_page(
+        self,
+        *,
+        client: httpx.AsyncClient,
+        url: str,
+        staging_dir: Path,
+        idx: int,
+        throttled: bool = True,
+        sample: Optional[PageSample] = None,
+    ) -> tuple[Path, str]:
+        sample = sample or PageSample(download_id=0, host="", ok=False)
+        requested_at = monotonic()
+        async with client.stream("GET", url) as response:
+            response.raise_for_status()
+            received_at = monotonic()
+            ext = _detect_ext(url, response.headers.get("content-type"))
+            part_file = staging_dir / f".{idx:03d}.{ext}.part"
+
+            size = 0
+            disk_seconds = 0.0
+            throttle_seconds = 0.0
+            handle = await asyncio.to_thread(part_file.open, "wb")
+            try:
+                async for chunk in response.aiter_bytes(STREAM_CHUNK_SIZE):
+                    if throttled:
+                        # Waiting on our own budget is not the source's fault.
+                        throttle_started = monotonic()
+                        await self.bandwidth.consume(len(chunk))
+                        throttle_seconds += monotonic() - throttle_started
+                    write_started = monotonic()
+                    await asyncio.to_thread(handle.write, chunk)
+                    disk_seconds += monotonic() - write_started
+                    size += len(chunk)
+                write_started = monotonic()
+                await asyncio.to_thread(_sync_and_close, handle)
+                disk_seconds += monotonic() - write_started
+            except BaseException:
+                await asyncio.to_thread(handle.close)
+                with contextlib.suppress(OSError):
+                    part_file.unlink(missing_ok=True)
+                raise
+
+        # Only the successful attempt is timed; earlier ones show up as retries.
+        sample.ttfb_seconds = received_at - requested_at
+        sample.transfer_seconds = monotonic() - received_at - disk_seconds - throttle_seconds
+        sample.disk_seconds = disk_seconds
+        sample.throttle_seconds = throttle_seconds
+        sample.bytes = size
+        return part_file, ext
+
+    async def _with_retries(
+        self,
+        download_id: int,
+        attempt,
+        *,
+        retries: int,
+        on_retry: Optional[Callable[[], None]] = None,
+    ):
+        """Run ``attempt`` until it succeeds, retrying transient HTTP errors.
+
+        Waits follow jittered exponential backoff unless the server sent a
+        Retry-After header. Pause and cancel are honoured between attempts.
+        """
+        attempt_number = 0
+        while True:
+            self._check_interrupted(download_id)
+            try:
+                return await attempt()
+            except Exception as exc:
+                if attempt_number >= retries or not _is_retryable(exc):
+                    raise
+                delay = _retry_delay(attempt_number, exc)
+                attempt_number += 1
+                if on_retry is not None:
+                    on_retry()
+            await asyncio.sleep(delay)
+
+    async def _download_pages(
+        self,
+        *,
+        download_id: int,
+        scraper,
+        pages: list[str],
+        output,
+        page_concurrency: int,
+        reporter: ProgressReporter,
+        completed_pages: Optional[set[int]] = None,
+        retries: int = DEFAULT_PAGE_RETRIES,
+        throttled: bool = True,
+        transcode: Optional[TranscodeConfig] = None,
+    ) -> int:
+        """Fetch every page not in ``completed_pages``; returns bytes written."""
+        completed_pages = completed_pages or set()
+        transcode = transcode or TranscodeConfig()
+        remaining = [
+            (idx, page_url)
+            for idx, page_url in enumerate(pages, start=1)
+            if idx not in completed_pages
+        ]
+        if not remaining:
+            return 0
+
+        # Resolving a page (an HTML fetch for some sources) runs ahead of the
+        # image transfers through a bounded queue, so the two overlap instead
+        # of adding up for every page.
+        resolved: asyncio.Queue[Optional[tuple[int, str, PageSample]]] = asyncio.Queue(
+            maxsize=page_concurrency * 2
+        )
+        to_resolve = iter(remaining)
+        resolver_count = min(RESOLVE_CONCURRENCY, len(remaining))
+        resolvers_left = resolver_count
+        transferred = 0
+
+        async def resolve_stage() -> None:
+            nonlocal resolvers_left
+            for idx, page_url in to_resolve:
+                sample = PageSample(download_id=download_id, host=urlsplit(page_url).netloc, ok=False)
+                started = monotonic()
+                try:
+                    image_url = await self._with_retries(
+                        download_id,
+                        lambda: scraper.resolve_image(page_url),
+                        retries=retries,
+                        on_retry=lambda: setattr(sample, "retries", sample.retries + 1),
+                    )
+                except _DownloadInterrupted:
+                    raise
+                except Exception:
+                    self.metrics.record_page(sample)
+                    reporter.page_failed(idx)
+                    continue
+                sample.resolve_seconds = monotonic() - started
+                sample.host = urlsplit(image_url).netloc
+                await resolved.put((idx, image_url, sample))
+            resolvers_left -= 1
+            if resolvers_left == 0:
+                for _ in range(page_concurrency):
+                    await resolved.put(None)
+
+        async def fetch_stage() -> None:
+            nonlocal transferred
+            while True:
+                item = await resolved.get()
+                if item is None:
+                    return
+                idx, image_url, sample = item
+                try:
+                    part_file, ext = await self._with_retries(
+                        download_id,
+                        lambda: self._stream_page(
+                            client=self.http.client_for(image_url),
+                            url=image_url,
+                            staging_dir=output.staging_dir,
+                            idx=idx,
+                            throttled=throttled,
+                            sample=sample,
+                        ),
+                        retries=retries,
+                        on_retry=lambda: setattr(sample, "retries", sample.retries + 1),
+                    )
+                    saved = 0
+                    if transcode.enabled:
+                        part_file, ext, saved = await self.transcoder.transcode(part_file, ext, transcode)
+                    # Pages are named from their index, so they stay in reading
+                    # order regardless of which request finishes first.
+                    stored_at = monotonic()
+                    await output.add_page(idx, ext, part_file)
+                    sample.disk_seconds += monotonic() - stored_at
+                except _DownloadInterrupted:
+                    raise
+                except Exception:
+                    self.metrics.record_page(sample)
+                    reporter.page_failed(idx)
+                    continue
+                sample.ok = True
+                self.metrics.record_page(sample)
+                self.storage.page_written(download_id, sample.bytes - saved)
+                transferred += sample.bytes
+                reporter.page_completed(idx, bytes_saved=saved)
+
+        tasks = [
+            *(asyncio.create_task(resolve_stage()) for _ in range(resolver_count)),
+            *(asyncio.create_task(fetch_stage()) for _ in range(page_concurrency)),
+        ]
+        try:
+            await asyncio.gather(*tasks)
+        except BaseException:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            raise
+        return transferred
+
     async def _run_download(self, download_id: int) -> None:
+        if not self._claim(download_id):
+            return
+
         with Session(engine) as db:
             download = db.get(Download, download_id)
             if not download:
                 return
-            if download.status in {"completed", "cancelled"}:
-                return
 
             chapter_url = download.chapter_url
             source = download.source
             manga_id = download.manga_id
             chapter_number = download.chapter_number
             chapter_title = download.chapter_title
+            existing_path = download.file_path
+            downloaded_pages = download.downloaded_pages if existing_path else 0
+            bytes_saved = download.bytes_saved
+            # Interactive jobs are what the reader is waiting for, so only
+            # normal and background jobs count against the bandwidth budget.
+            throttled = normalize_priority(download.priority) != "interactive"
 
             if not chapter_url or not source:
                 download.status = "failed"
                 download.error = "Missing chapter_url or source"
+                download.lease_owner = None
+                download.lease_expires_at = None
                 download.updated_at = datetime.utcnow()
                 db.add(download)
                 db.commit()
+                download_events.publish(
+                    "status",
+                    download_id,
+                    status="failed",
+                    error=download.error,
+                )
                 return
 
             manga = db.get(Manga, manga_id)
             manga_title = manga.title if manga else None
 
-            download.status = "downloading"
-            download.error = None
-            download.updated_at = datetime.utcnow()
-            db.add(download)
-            db.commit()
-
+        reporter = ProgressReporter(download_id)
+        output = None
+        started = monotonic()
+        transferred = 0
         try:
             scraper = self._resolve_scraper(source)
             pages = await scraper.pages(chapter_url)
             if not pages:
                 raise RuntimeError("No pages returned by source")
 
-            with Session(engine) as db:
-                current = db.get(Download, download_id)
-                if not current:
-                    return
-                current.total_pages = len(pages)
-                db.add(current)
-                db.commit()
-
             root = self._resolve_download_root()
-            chapter_dir = self._resolve_chapter_dir(
+            # Check the remaining pages fit before fetching any of them, or
+            # creating the output, so a full disk or quota stops the chapter
+            # up front and leaves nothing behind. Pages a resume already has
+            # on disk count as used.
+            quota = int(self._read_number_setting("downloads.quota_bytes", 0, minimum=0))
+            refused = await asyncio.to_thread(
+                self.storage.reserve,
+                download_id,
+                root,
+                self.storage.estimate(len(pages) - downloaded_pages),
+                quota=quota,
+            )
+            if refused:
+                reporter.state.total_pages = len(pages)
+                reporter.state.downloaded_pages = downloaded_pages
+                reporter.state.file_path = existing_path
+                reporter.state.bytes_saved = bytes_saved
+                reporter.transition("failed", error=refused)
+                return
+
+            output = self._open_output(
                 root=root,
                 manga_title=manga_title,
                 chapter_number=chapter_number,
                 chapter_title=chapter_title,
                 download_id=download_id,
+                existing_path=existing_path,
+            )
+            await asyncio.to_thread(output.open)
+            completed_pages = await asyncio.to_thread(output.completed_pages, len(pages))
+            reporter.start(
+                total_pages=len(pages),
+                file_path=str(output.path),
+                downloaded_pages=len(completed_pages),
+                bytes_saved=bytes_saved if completed_pages else 0,
             )
 
-            async with httpx.AsyncClient(timeout=30.0, follow_redirects=True) as client:
-                for idx, page_url in enumerate(pages, start=1):
-                    with Session(engine) as db:
-                        current = db.get(Download, download_id)
-                        if not current or current.status == "cancelled":
-                            return
-                        if download_id in self.paused_ids:
-                            current.status = "paused"
-                            current.updated_at = datetime.utcnow()
-                            db.add(current)
-                            db.commit()
-                            return
-
-                    resolved = await scraper.resolve_image(page_url)
-                    response = await client.get(resolved)
-                    response.raise_for_status()
-                    ext = _detect_ext(resolved, response.headers.get("content-type"))
-                    out_file = chapter_dir / f"{idx:03d}.{ext}"
-                    out_file.write_bytes(response.content)
-
-                    with Session(engine) as db:
-                        current = db.get(Download, download_id)
-                        if not current:
-                            return
-                        current.downloaded_pages = idx
-                        current.progress = idx / len(pages)
-                        current.file_path = str(chapter_dir)
-                        current.updated_at = datetime.utcnow()
-                        db.add(current)
-                        db.commit()
+            page_concurrency = self._read_page_concurrency()
+            retries = int(
+                self._read_number_setting("downloads.page_retries", DEFAULT_PAGE_RETRIES, minimum=0)
+            )
+            transcode = self._read_transcode_config()
+            all_pages = set(range(1, len(pages) + 1))
+            try:
+                transferred += await self._download_pages(
+                    download_id=download_id,
+                    scraper=scraper,
+                    pages=pages,
+                    output=output,
+                    page_concurrency=page_concurrency,
+                    reporter=reporter,
+                    completed_pages=completed_pages,
+                    retries=retries,
+                    throttled=throttled,
+                    transcode=transcode,
+                )
+                if reporter.state.failed_pages:
+                    # One more targeted pass over just the pages that failed,
+                    # now that the rest of the chapter is out of the way.
+                    transferred += await self._download_pages(
+                        download_id=download_id,
+                        scraper=scraper,
+                        pages=pages,
+                        output=output,
+                        page_concurrency=page_concurrency,
+                        reporter=reporter,
+                        completed_pages=all_pages - reporter.state.failed_pages,
+                        retries=retries,
+                        throttled=throttled,
+                        transcode=transcode,
+                    )
+            except _DownloadInterrupted as interrupted:
+                # A transition writes the final status and drops the lease.
+                reporter.transition(interrupted.status)
+                return
+
+            if reporter.state.failed_pages:
+                failed = sorted(reporter.state.failed_pages)
+                listed = ", ".join(str(idx) for idx in failed[:10])
+                if len(failed) > 10:
+                    listed += ", ..."
+                reporter.transition(
+                    "failed",
+                    error=f"{len(failed)} of {len(pages)} pages failed ({listed}); resume to retry them",
+                )
+                return
 
+            await asyncio.to_thread(output.finalize)
+            reporter.state.status = "completed"
             with Session(engine) as db:
                 current = db.get(Download, download_id)
                 if not current:
                     return
                 current.status = "completed"
                 current.progress = 1.0
+                current.lease_owner = None
+                current.lease_expires_at = None
+                current.total_pages = reporter.state.total_pages
+                current.downloaded_pages = reporter.state.downloaded_pages
+                current.file_path = reporter.state.file_path
+                current.failed_pages = None
+                current.bytes_saved = reporter.state.bytes_saved
                 current.updated_at = datetime.utcnow()
                 db.add(current)
 
@@ -277,15 +982,75 @@ class DownloadManager:
                     chapter.updated_at = datetime.utcnow()
                     db.add(chapter)
                 db.commit()
+            reporter.publish("status")
         except Exception as exc:
-            with Session(engine) as db:
-                current = db.get(Download, download_id)
-                if current:
-                    current.status = "failed"
-                    current.error = str(exc)
-                    current.updated_at = datetime.utcnow()
-                    db.add(current)
-                    db.commit()
+            reporter.transition("failed", error=str(exc))
+        finally:
+            if output is not None:
+                output.close()
+            self.storage.release(download_id)
+            self.metrics.record_download(
+                DownloadSample(
+                    download_id=download_id,
+                    source=source,
+                    status=reporter.state.status,
+                    pages=reporter.state.downloaded_pages,
+                    bytes=transferred,
+                    seconds=monotonic() - started,
+                )
+            )
+
+
+class _DownloadInterrupted(Exception):
+    def __init__(self, status: str) -> None:
+        super().__init__(status)
+        self.status = status
+
+
+def _sync_and_close(handle) -> None:
+    try:
+        handle.flush()
+        os.fsync(handle.fileno())
+    finally:
+        handle.close()
+
+
+def _is_retryable(exc: Exception) -> bool:
+    if isinstance(exc, httpx.HTTPStatusError):
+        status = exc.response.status_code
+        return status == 429 or status >= 500
+    return isinstance(exc, httpx.TransportError)
+
+
+def _retry_delay(attempt: int, exc: Exception) -> float:
+    if isinstance(exc, httpx.HTTPStatusError):
+        retry_after = _parse_retry_after(exc.response.headers.get("retry-after"))
+        if retry_after is not None:
+            return min(retry_after, RETRY_MAX_DELAY)
+    backoff = min(RETRY_BASE_DELAY * (2 ** attempt), RETRY_MAX_DELAY)
+    return random.uniform(backoff / 2, backoff)
+
+
+def _parse_retry_after(value: Optional[str]) -> Optional[float]:
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if retry_at.tzinfo is None:
+        retry_at = retry_at.replace(tzinfo=timezone.utc)
+    return max((retry_at - datetime.now(timezone.utc)).total_seconds(), 0.0)
+
+
+def _coerce_max_concurrent(value: Any) -> int:
+    try:
+        return max(1, int(value))
+    except (TypeError, ValueError):
+        return DEFAULT_MAX_CONCURRENT
 
 
 def _detect_ext(url: str, content_type: Optional[str]) -> str:
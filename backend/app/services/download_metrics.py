@@ -0,0 +1,132 @@
+from collections import deque
+from dataclasses import dataclass
+from time import time
+from typing import Optional
+
+DEFAULT_WINDOW_SECONDS = 15 * 60
+MAX_PAGE_SAMPLES = 5000
+MAX_DOWNLOAD_SAMPLES = 500
+
+
+@dataclass
+class PageSample:
+    download_id: int
+    host: str
+    ok: bool
+    resolve_seconds: float = 0.0
+    ttfb_seconds: float = 0.0
+    transfer_seconds: float = 0.0
+    disk_seconds: float = 0.0
+    throttle_seconds: float = 0.0
+    bytes: int = 0
+    retries: int = 0
+    recorded_at: float = 0.0
+
+
+@dataclass
+class DownloadSample:
+    download_id: int
+    source: Optional[str]
+    status: str
+    pages: int
+    bytes: int
+    seconds: float
+    recorded_at: float = 0.0
+
+
+class DownloadMetrics:
+    """Rolling window of per-page and per-download download timings.
+
+    Samples live in bounded deques; ``summary`` aggregates the ones recorded
+    in the last ``window_seconds``.
+    """
+
+    def __init__(self, window_seconds: float = DEFAULT_WINDOW_SECONDS) -> None:
+        self.window_seconds = window_seconds
+        self._pages: deque[PageSample] = deque(maxlen=MAX_PAGE_SAMPLES)
+        self._downloads: deque[DownloadSample] = deque(maxlen=MAX_DOWNLOAD_SAMPLES)
+
+    def record_page(self, sample: PageSample) -> None:
+        sample.recorded_at = sample.recorded_at or time()
+        self._pages.append(sample)
+
+    def record_download(self, sample: DownloadSample) -> None:
+        sample.recorded_at = sample.recorded_at or time()
+        self._downloads.append(sample)
+
+    def summary(self, now: Optional[float] = None) -> dict:
+        cutoff = (now or time()) - self.window_seconds
+        pages = [sample for sample in self._pages if sample.recorded_at >= cutoff]
+        downloads = [sample for sample in self._downloads if sample.recorded_at >= cutoff]
+        ok_pages = [sample for sample in pages if sample.ok]
+
+        hosts: dict[str, list[PageSample]] = {}
+        for sample in ok_pages:
+            hosts.setdefault(sample.host, []).append(sample)
+
+        return {
+            "window_seconds": self.window_seconds,
+            "pages": {
+                "completed": len(ok_pages),
+                "failed": len(pages) - len(ok_pages),
+                "retries": sum(sample.retries for sample in pages),
+                "bytes": sum(sample.bytes for sample in ok_pages),
+                "resolve_seconds": _distribution([s.resolve_seconds for s in ok_pages]),
+                "ttfb_seconds": _distribution([s.ttfb_seconds for s in ok_pages]),
+                "transfer_seconds": _distribution([s.transfer_seconds for s in ok_pages]),
+                "disk_seconds": _distribution([s.disk_seconds for s in ok_pages]),
+                "throttle_seconds": _distribution([s.throttle_seconds for s in ok_pages]),
+            },
+            "hosts": {
+                host: {
+                    "pages": len(samples),
+                    "bytes": sum(s.bytes for s in samples),
+                    "bytes_per_second": _throughput(samples),
+                    "ttfb_p50": _percentile(sorted(s.ttfb_seconds for s in samples), 0.5),
+                }
+                for host, samples in sorted(hosts.items())
+            },
+            "downloads": {
+                "finished": len(downloads),
+                "failed": sum(1 for sample in downloads if sample.status != "completed"),
+                "bytes": sum(sample.bytes for sample in downloads),
+                "seconds": _distribution([sample.seconds for sample in downloads]),
+                "recent": [
+                    {
+                        "id": sample.download_id,
+                        "source": sample.source,
+                        "status": sample.status,
+                        "pages": sample.pages,
+                        "bytes": sample.bytes,
+                        "seconds": round(sample.seconds, 3),
+                        "bytes_per_second": round(sample.bytes / sample.seconds) if sample.seconds > 0 else None,
+                    }
+                    for sample in list(downloads)[-20:][::-1]
+                ],
+            },
+        }
+
+
+def _throughput(samples: list[PageSample]) -> Optional[float]:
+    transfer = sum(sample.transfer_seconds for sample in samples)
+    if transfer <= 0:
+        return None
+    return round(sum(sample.bytes for sample in samples) / transfer)
+
+
+def _distribution(values: list[float]) -> dict:
+    ordered = sorted(values)
+    return {
+        "count": len(ordered),
+        "avg": round(sum(ordered) / len(ordered), 4) if ordered else None,
+        "p50": _percentile(ordered, 0.5),
+        "p95": _percentile(ordered, 0.95),
+        "max": round(ordered[-1], 4) if ordered else None,
+    }
+
+
+def _percentile(ordered: list[float], fraction: float) -> Optional[float]:
+    if not ordered:
+        return None
+    index = min(int(round(fraction * (len(ordered) - 1))), len(ordered) - 1)
+    return round(ordered[index], 4)
@@ -0,0 +1,139 @@
+import asyncio
+import contextlib
+import os
+import re
+import shutil
+import zipfile
+from pathlib import Path
+from typing import Optional
+
+from app.services.blob_store import BlobStore
+
+PAGE_FILE_PATTERN = re.compile(r"^(\d+)\.(jpg|png|webp|gif)$")
+IMAGE_SIGNATURES = (b"\xff\xd8\xff", b"\x89PNG\r\n\x1a\n", b"GIF87a", b"GIF89a")
+OUTPUT_FORMATS = ("folder", "cbz")
+DEFAULT_OUTPUT_FORMAT = "folder"
+
+
+def normalize_output_format(value) -> str:
+    output_format = str(value or "").strip().lower()
+    return output_format if output_format in OUTPUT_FORMATS else DEFAULT_OUTPUT_FORMAT
+
+
+class FolderOutput:
+    """Writes each page as a loose ``NNN.ext`` file in the chapter folder.
+
+    With a blob store, pages are hard links to content-addressed blobs, so a
+    page already in the image cache is not stored a second time.
+    """
+
+    def __init__(self, chapter_dir: Path, blobs: Optional[BlobStore] = None) -> None:
+        self.path = chapter_dir
+        self.staging_dir = chapter_dir
+        self.blobs = blobs
+
+    def open(self) -> None:
+        self.path.mkdir(parents=True, exist_ok=True)
+
+    def completed_pages(self, total_pages: int) -> set[int]:
+        completed: set[int] = set()
+        for path in self.path.iterdir():
+            if path.name.endswith(".part"):
+                with contextlib.suppress(OSError):
+                    path.unlink()
+                continue
+            match = PAGE_FILE_PATTERN.match(path.name)
+            if not match:
+                continue
+            idx = int(match.group(1))
+            if 1 <= idx <= total_pages and _is_complete_image(path):
+                completed.add(idx)
+        return completed
+
+    async def add_page(self, idx: int, ext: str, part_file: Path) -> None:
+        target = self.path / f"{idx:03d}.{ext}"
+        if self.blobs is not None:
+            await asyncio.to_thread(self.blobs.add_file, part_file, target)
+        else:
+            await asyncio.to_thread(os.replace, part_file, target)
+
+    def close(self) -> None:
+        pass
+
+    def finalize(self) -> None:
+        pass
+
+
+class CbzOutput:
+    """Appends pages to a ``.cbz`` archive as uncompressed stored entries.
+
+    Pages are staged one by one next to the archive and appended as soon as
+    they arrive, so nothing is buffered in memory. The archive is built as
+    ``<name>.cbz.part`` and renamed once every page is in. Closing it on
+    pause or failure writes the central directory, so a resumed download
+    can append to it instead of starting over.
+    """
+
+    def __init__(self, archive_path: Path) -> None:
+        self.path = archive_path
+        self.part_path = archive_path.with_name(f"{archive_path.name}.part")
+        self.staging_dir = archive_path.with_name(f".{archive_path.stem}.pages")
+        self._archive: Optional[zipfile.ZipFile] = None
+        self._lock = asyncio.Lock()
+
+    def open(self) -> None:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.staging_dir.mkdir(parents=True, exist_ok=True)
+        if self.part_path.exists():
+            try:
+                self._archive = zipfile.ZipFile(self.part_path, "a", compression=zipfile.ZIP_STORED)
+                return
+            except zipfile.BadZipFile:
+                # Interrupted without a central directory; start the archive over.
+                self.part_path.unlink()
+        self._archive = zipfile.ZipFile(self.part_path, "w", compression=zipfile.ZIP_STORED)
+
+    def completed_pages(self, total_pages: int) -> set[int]:
+        for path in self.staging_dir.iterdir():
+            with contextlib.suppress(OSError):
+                path.unlink()
+        completed: set[int] = set()
+        if self._archive is None:
+            return completed
+        for name in self._archive.namelist():
+            match = PAGE_FILE_PATTERN.match(name)
+            if match and 1 <= int(match.group(1)) <= total_pages:
+                completed.add(int(match.group(1)))
+        return completed
+
+    async def add_page(self, idx: int, ext: str, part_file: Path) -> None:
+        # ZipFile allows one writer at a time, so concurrent pages take turns.
+        async with self._lock:
+            await asyncio.to_thread(self._append, idx, ext, part_file)
+
+    def close(self) -> None:
+        if self._archive is not None:
+            self._archive.close()
+            self._archive = None
+        shutil.rmtree(self.staging_dir, ignore_errors=True)
+
+    def finalize(self) -> None:
+        self.close()
+        os.replace(self.part_path, self.path)
+
+    def _append(self, idx: int, ext: str, part_file: Path) -> None:
+        try:
+            self._archive.write(part_file, arcname=f"{idx:03d}.{ext}", compress_type=zipfile.ZIP_STORED)
+        finally:
+            part_file.unlink(missing_ok=True)
+
+
+def _is_complete_image(path: Path) -> bool:
+    try:
+        with path.open("rb") as handle:
+            header = handle.read(12)
+    except OSError:
+        return False
+    if header.startswith(IMAGE_SIGNATURES):
+        return True
+    return header[:4] == b"RIFF" and header[8:12] == b"WEBP"
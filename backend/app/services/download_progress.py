@@ -0,0 +1,139 @@
+import json
+from dataclasses import dataclass, field
+from datetime import datetime
+from time import monotonic
+from typing import Optional
+
+from sqlmodel import Session
+
+from app.db.database import engine
+from app.db.models import Download
+from app.services.download_events import download_events
+
+PROGRESS_FLUSH_INTERVAL = 2.0
+PROGRESS_FLUSH_PAGES = 10
+
+
+@dataclass
+class DownloadProgress:
+    download_id: int
+    status: str = "downloading"
+    total_pages: int = 0
+    downloaded_pages: int = 0
+    file_path: Optional[str] = None
+    error: Optional[str] = None
+    failed_pages: set[int] = field(default_factory=set)
+    bytes_saved: int = 0
+
+    @property
+    def progress(self) -> float:
+        if self.total_pages <= 0:
+            return 0.0
+        return min(self.downloaded_pages / self.total_pages, 1.0)
+
+
+class ProgressReporter:
+    """Keeps download progress in memory and writes it to the row in batches.
+
+    Page completions are flushed every ``flush_pages`` pages or
+    ``flush_interval`` seconds, whichever comes first. Status transitions
+    are always written immediately.
+    """
+
+    def __init__(
+        self,
+        download_id: int,
+        *,
+        flush_interval: float = PROGRESS_FLUSH_INTERVAL,
+        flush_pages: int = PROGRESS_FLUSH_PAGES,
+    ) -> None:
+        self.state = DownloadProgress(download_id=download_id)
+        self.flush_interval = flush_interval
+        self.flush_pages = max(1, flush_pages)
+        self._pending_pages = 0
+        self._last_flush = monotonic()
+
+    def start(
+        self,
+        *,
+        total_pages: int,
+        file_path: str,
+        downloaded_pages: int = 0,
+        bytes_saved: int = 0,
+    ) -> None:
+        self.state.total_pages = total_pages
+        self.state.downloaded_pages = downloaded_pages
+        self.state.file_path = file_path
+        self.state.bytes_saved = bytes_saved
+        self.flush()
+        self.publish("progress")
+
+    def page_completed(self, idx: Optional[int] = None, *, bytes_saved: int = 0) -> None:
+        self.state.downloaded_pages += 1
+        self.state.bytes_saved += bytes_saved
+        self.state.failed_pages.discard(idx)
+        self._page_changed()
+
+    def page_failed(self, idx: int) -> None:
+        self.state.failed_pages.add(idx)
+        self._page_changed()
+
+    def _page_changed(self) -> None:
+        self.publish("progress")
+        self._pending_pages += 1
+        if (
+            self._pending_pages >= self.flush_pages
+            or monotonic() - self._last_flush >= self.flush_interval
+        ):
+            self.flush()
+
+    def transition(self, status: str, *, error: Optional[str] = None) -> None:
+        self.state.status = status
+        self.state.error = error
+        self._write(include_status=True)
+        self.publish("status")
+
+    def publish(self, event_type: str) -> None:
+        # Subscribers get every page change even though the row is only
+        # written in batches.
+        download_events.publish(
+            event_type,
+            self.state.download_id,
+            status=self.state.status,
+            progress=1.0 if self.state.status == "completed" else self.state.progress,
+            total_pages=self.state.total_pages,
+            downloaded_pages=self.state.downloaded_pages,
+            failed_pages=sorted(self.state.failed_pages),
+            bytes_saved=self.state.bytes_saved,
+            error=self.state.error,
+        )
+
+    def flush(self) -> None:
+        self._write(include_status=False)
+
+    def _write(self, *, include_status: bool) -> None:
+        self._pending_pages = 0
+        self._last_flush = monotonic()
+        with Session(engine) as db:
+            current = db.get(Download, self.state.download_id)
+            if not current:
+                return
+            # Status is owned by pause/cancel calls between transitions, so a
+            # plain progress flush must not overwrite it.
+            if include_status:
+                current.status = self.state.status
+                current.error = self.state.error
+                if self.state.status != "downloading":
+                    current.lease_owner = None
+                    current.lease_expires_at = None
+            current.total_pages = self.state.total_pages
+            current.downloaded_pages = self.state.downloaded_pages
+            current.progress = 1.0 if self.state.status == "completed" else self.state.progress
+            current.file_path = self.state.file_path
+            current.failed_pages = (
+                json.dumps(sorted(self.state.failed_pages)) if self.state.failed_pages else None
+            )
+            current.bytes_saved = self.state.bytes_saved
+            current.updated_at = datetime.utcnow()
+            db.add(current)
+            db.commit()
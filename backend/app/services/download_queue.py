@@ -0,0 +1,162 @@
+import asyncio
+import contextlib
+from collections import OrderedDict, deque
+from typing import Any, Optional
+
+PRIORITIES = ("interactive", "normal", "background")
+DEFAULT_PRIORITY = "normal"
+# How many times a non-empty lane may be passed over before it is served
+# ahead of the higher lanes, so bulk jobs keep moving under interactive load.
+LANE_PATIENCE = {"interactive": 0, "normal": 4, "background": 8}
+DEFAULT_SOURCE_CONCURRENCY = 2
+
+
+def normalize_priority(value: Any) -> str:
+    priority = str(value or "").strip().lower()
+    return priority if priority in PRIORITIES else DEFAULT_PRIORITY
+
+
+class DownloadQueue:
+    """Priority lanes of download ids with the asyncio.Queue get/join API.
+
+    ``get`` serves the highest lane with work it may start, except that a
+    lower lane skipped more than its patience allows is served next. Within
+    a lane, sources take turns and each is FIFO; a source already running
+    ``source_limit`` jobs is passed over until one of them is done. The
+    interactive lane ignores the limit, since the reader is waiting on it.
+    Putting an id that is already queued only ever promotes it.
+    """
+
+    def __init__(self, source_limit: int = DEFAULT_SOURCE_CONCURRENCY) -> None:
+        self.source_limit = source_limit
+        self._lanes: dict[str, OrderedDict[str, deque[int]]] = {
+            priority: OrderedDict() for priority in PRIORITIES
+        }
+        self._queued: dict[int, tuple[str, str]] = {}
+        # One source per pop of an id; an id queued again while it runs
+        # is popped twice and needs a task_done for each.
+        self._running: dict[int, list[str]] = {}
+        self._running_per_source: dict[str, int] = {}
+        self._skipped: dict[str, int] = {priority: 0 for priority in PRIORITIES}
+        self._getters: deque[asyncio.Future] = deque()
+        self._unfinished = 0
+        self._finished = asyncio.Event()
+        self._finished.set()
+
+    def qsize(self) -> int:
+        return len(self._queued)
+
+    def empty(self) -> bool:
+        return not self._queued
+
+    def __contains__(self, download_id: int) -> bool:
+        return download_id in self._queued
+
+    def put_nowait(self, download_id: int, priority: str = DEFAULT_PRIORITY, source: str = "") -> None:
+        priority = normalize_priority(priority)
+        current = self._queued.get(download_id)
+        if current is not None:
+            current_priority, current_source = current
+            if PRIORITIES.index(priority) < PRIORITIES.index(current_priority):
+                self._remove(download_id)
+                self._append(download_id, priority, current_source)
+                self._wakeup_next()
+            return
+
+        self._append(download_id, priority, source)
+        self._unfinished += 1
+        self._finished.clear()
+        self._wakeup_next()
+
+    def set_source_limit(self, limit: int) -> None:
+        self.source_limit = max(1, limit)
+        # A higher limit can make several queued jobs startable at once.
+        for _ in range(len(self._getters)):
+            self._wakeup_next()
+
+    def running_per_source(self) -> dict[str, int]:
+        return dict(self._running_per_source)
+
+    async def get(self) -> int:
+        while not self._ready_lanes():
+            getter = asyncio.get_running_loop().create_future()
+            self._getters.append(getter)
+            try:
+                await getter
+            except BaseException:
+                getter.cancel()
+                with contextlib.suppress(ValueError):
+                    self._getters.remove(getter)
+                if self._ready_lanes() and not getter.cancelled():
+                    self._wakeup_next()
+                raise
+        return self._pop()
+
+    def task_done(self, download_id: Optional[int] = None) -> None:
+        if self._unfinished <= 0:
+            raise ValueError("task_done() called too many times")
+        sources = self._running.get(download_id) if download_id is not None else None
+        if sources:
+            source = sources.pop()
+            if not sources:
+                del self._running[download_id]
+            self._running_per_source[source] -= 1
+            if not self._running_per_source[source]:
+                del self._running_per_source[source]
+            self._wakeup_next()
+        self._unfinished -= 1
+        if self._unfinished == 0:
+            self._finished.set()
+
+    async def join(self) -> None:
+        await self._finished.wait()
+
+    def _has_capacity(self, priority: str, source: str) -> bool:
+        return priority == "interactive" or self._running_per_source.get(source, 0) < self.source_limit
+
+    def _ready_lanes(self) -> list[str]:
+        return [
+            priority
+            for priority in PRIORITIES
+            if any(self._has_capacity(priority, source) for source in self._lanes[priority])
+        ]
+
+    def _pop(self) -> int:
+        waiting = self._ready_lanes()
+        chosen = waiting[0]
+        for priority in reversed(waiting[1:]):
+            if self._skipped[priority] >= LANE_PATIENCE[priority]:
+                chosen = priority
+                break
+
+        for priority in waiting:
+            self._skipped[priority] = 0 if priority == chosen else self._skipped[priority] + 1
+
+        lane = self._lanes[chosen]
+        source = next(source for source in lane if self._has_capacity(chosen, source))
+        download_id = lane[source][0]
+        self._remove(download_id)
+        # The source goes to the back of the lane so the others get a turn.
+        if source in lane:
+            lane.move_to_end(source)
+        self._running.setdefault(download_id, []).append(source)
+        self._running_per_source[source] = self._running_per_source.get(source, 0) + 1
+        return download_id
+
+    def _append(self, download_id: int, priority: str, source: str) -> None:
+        self._lanes[priority].setdefault(source, deque()).append(download_id)
+        self._queued[download_id] = (priority, source)
+
+    def _remove(self, download_id: int) -> None:
+        priority, source = self._queued.pop(download_id)
+        ids = self._lanes[priority][source]
+        ids.remove(download_id)
+        if not ids:
+            del self._lanes[priority][source]
+
+    def _wakeup_next(self) -> None:
+        while self._getters:
+            getter = self._getters.popleft()
+            if not getter.done():
+                getter.set_result(None)
+                break
@@ -0,0 +1,130 @@
+import os
+import shutil
+import threading
+from pathlib import Path
+from typing import Optional
+
+# Used for the estimate until real pages have been measured.
+DEFAULT_PAGE_BYTES = 512 * 1024
+# Always leave this much free on the volume holding the downloads root.
+MIN_FREE_BYTES = 256 * 1024 * 1024
+# Weight of each new page in the running average page size.
+PAGE_SIZE_SMOOTHING = 0.05
+
+
+def path_size(path: Path) -> int:
+    """Total size of a file, or of every file below a directory."""
+    if path.is_file():
+        return path.stat().st_size
+    total = 0
+    for dirpath, _dirnames, filenames in os.walk(path):
+        for name in filenames:
+            try:
+                total += os.stat(os.path.join(dirpath, name)).st_size
+            except OSError:
+                continue
+    return total
+
+
+def remove_download_path(target: Path) -> int:
+    """Delete a chapter folder or archive and its leftovers; returns bytes freed.
+
+    Pages linked to shared blobs are only unlinked here; the blobs left
+    unused are swept up afterwards by ``BlobStore.collect``.
+    """
+    paths = [target]
+    if target.suffix == ".cbz":
+        paths += [target.with_name(f"{target.name}.part"), target.with_name(f".{target.stem}.pages")]
+    freed = 0
+    for path in paths:
+        if not path.exists():
+            continue
+        size = path_size(path)
+        if path.is_dir():
+            shutil.rmtree(path, ignore_errors=True)
+        else:
+            path.unlink(missing_ok=True)
+        if not path.exists():
+            freed += size
+    return freed
+
+
+class DownloadStorage:
+    """Keeps track of how much the downloads root holds and how much is coming.
+
+    The root is walked once; after that the total is adjusted as pages are
+    written and chapters deleted. Running jobs reserve their estimated size
+    so two chapters starting together cannot both squeeze under the quota.
+    """
+
+    def __init__(self) -> None:
+        self.average_page_bytes = float(DEFAULT_PAGE_BYTES)
+        self._root: Optional[Path] = None
+        self._usage = 0
+        self._reserved: dict[int, int] = {}
+        self._lock = threading.Lock()
+
+    def usage(self, root: Path) -> int:
+        """Bytes below ``root``; walks the tree only when the root changes."""
+        with self._lock:
+            if self._root == root:
+                return self._usage
+        scanned = path_size(root) if root.exists() else 0
+        with self._lock:
+            if self._root != root:
+                self._root = root
+                self._usage = scanned
+            return self._usage
+
+    def reserved(self) -> int:
+        with self._lock:
+            return sum(self._reserved.values())
+
+    def estimate(self, page_count: int) -> int:
+        return int(max(page_count, 0) * self.average_page_bytes)
+
+    def reserve(self, download_id: int, root: Path, amount: int, *, quota: int) -> Optional[str]:
+        """Reserve ``amount`` bytes for a job, or return why it does not fit."""
+        used = self.usage(root)
+        free = shutil.disk_usage(root).free
+        with self._lock:
+            self._reserved.pop(download_id, None)
+            pending = sum(self._reserved.values())
+            if quota > 0 and used + pending + amount > quota:
+                return (
+                    f"Download quota exceeded: needs about {_format_bytes(amount)}, "
+                    f"{_format_bytes(used + pending)} of {_format_bytes(quota)} in use"
+                )
+            if free - pending - amount < MIN_FREE_BYTES:
+                return (
+                    f"Not enough disk space: needs about {_format_bytes(amount)}, "
+                    f"{_format_bytes(max(free - pending, 0))} free"
+                )
+            self._reserved[download_id] = amount
+            return None
+
+    def release(self, download_id: int) -> None:
+        with self._lock:
+            self._reserved.pop(download_id, None)
+
+    def page_written(self, download_id: int, size: int) -> None:
+        with self._lock:
+            self.average_page_bytes += (size - self.average_page_bytes) * PAGE_SIZE_SMOOTHING
+            if self._root is not None:
+                self._usage += size
+            if download_id in self._reserved:
+                self._reserved[download_id] = max(self._reserved[download_id] - size, 0)
+
+    def removed(self, path: Path, size: int) -> None:
+        with self._lock:
+            if self._root is not None and path.is_relative_to(self._root):
+                self._usage = max(self._usage - size, 0)
+
+
+def _format_bytes(value: int) -> str:
+    size = float(value)
+    for unit in ("B", "KiB", "MiB"):
+        if size < 1024:
+            return f"{size:.0f} B" if unit == "B" else f"{size:.1f} {unit}"
+        size /= 1024
+    return f"{size:.1f} GiB"
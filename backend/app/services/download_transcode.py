@@ -0,0 +1,144 @@
+import asyncio
+import contextlib
+import importlib.util
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Optional
+
+TRANSCODE_MODES = ("off", "png", "webp")
+DEFAULT_TRANSCODE_MODE = "off"
+DEFAULT_WEBP_QUALITY = 80
+
+
+@dataclass(frozen=True)
+class TranscodeConfig:
+    mode: str = DEFAULT_TRANSCODE_MODE
+    webp_quality: int = DEFAULT_WEBP_QUALITY
+
+    @classmethod
+    def from_settings(cls, mode: Any, webp_quality: Any) -> "TranscodeConfig":
+        normalized = str(mode or "").strip().lower()
+        if normalized not in TRANSCODE_MODES:
+            normalized = DEFAULT_TRANSCODE_MODE
+        try:
+            quality = min(max(int(webp_quality), 1), 100)
+        except (TypeError, ValueError):
+            quality = DEFAULT_WEBP_QUALITY
+        return cls(mode=normalized, webp_quality=quality)
+
+    @property
+    def enabled(self) -> bool:
+        return self.mode != "off" and _pillow_available()
+
+
+class PageTranscoder:
+    """Re-encodes downloaded pages in a process pool before they are stored.
+
+    ``png`` recompresses PNG pages losslessly; ``webp`` converts every still
+    page to WebP at the configured quality. A page is only replaced when the
+    new encoding is smaller, so the result is never bigger than the original.
+    """
+
+    def __init__(self, max_workers: Optional[int] = None) -> None:
+        self.max_workers = max_workers or max(1, (os.cpu_count() or 2) // 2)
+        self._executor: Optional[ProcessPoolExecutor] = None
+
+    async def transcode(self, part_file: Path, ext: str, config: TranscodeConfig) -> tuple[Path, str, int]:
+        """Return the page to store as ``(part_file, ext, bytes_saved)``."""
+        if not config.enabled or (config.mode == "png" and ext != "png"):
+            return part_file, ext, 0
+
+        target_ext = "webp" if config.mode == "webp" else ext
+        encoded = part_file.with_name(f"{part_file.name}.{target_ext}")
+        # Part files are named ".NNN.<ext>.part"; swap in the new extension.
+        stored = part_file.with_name(f"{part_file.name[: -len(f'{ext}.part')]}{target_ext}.part")
+        loop = asyncio.get_running_loop()
+        try:
+            saved = await loop.run_in_executor(
+                self._pool(),
+                _transcode_page,
+                str(part_file),
+                str(encoded),
+                str(stored),
+                config.mode,
+                config.webp_quality,
+            )
+        except BrokenProcessPool:
+            # A worker that died mid-write may have left its output behind.
+            self._executor = None
+            await asyncio.to_thread(_unlink_quietly, str(encoded))
+            saved = 0
+        except Exception:
+            # Pages Pillow cannot read are kept exactly as served.
+            saved = 0
+
+        if saved <= 0:
+            return part_file, ext, 0
+        return stored, target_ext, saved
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    def _pool(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            # Spawned rather than forked: the server process runs threads.
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.max_workers,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        return self._executor
+
+
+def _transcode_page(source: str, encoded: str, stored: str, mode: str, webp_quality: int) -> int:
+    """Encode ``source`` and, if smaller, store it as ``stored``; returns bytes saved.
+
+    Runs in a worker process, file moves included, so the event loop never
+    touches the disk for a transcode.
+    """
+    try:
+        size = _encode_page(source, encoded, mode, webp_quality)
+        original = os.path.getsize(source)
+        if size <= 0 or size >= original:
+            return 0
+        os.replace(encoded, stored)
+        if stored != source:
+            os.unlink(source)
+        return original - size
+    finally:
+        _unlink_quietly(encoded)
+
+
+def _unlink_quietly(path: str) -> None:
+    with contextlib.suppress(OSError):
+        os.unlink(path)
+
+
+def _encode_page(source: str, target: str, mode: str, webp_quality: int) -> int:
+    """Encode ``source`` into ``target`` in a worker process; returns the new size."""
+    from PIL import Image
+
+    with Image.open(source) as image:
+        if mode == "png":
+            if image.format != "PNG":
+                return 0
+            image.save(target, format="PNG", optimize=True)
+        else:
+            if getattr(image, "is_animated", False):
+                return 0
+            if image.mode not in ("RGB", "RGBA", "L", "LA"):
+                has_alpha = image.mode in ("P", "PA") and "transparency" in image.info
+                image = image.convert("RGBA" if has_alpha or image.mode == "PA" else "RGB")
+            image.save(target, format="WEBP", quality=webp_quality, method=4)
+    return os.path.getsize(target)
+
+
+def _pillow_available() -> bool:
+    # Transcoding needs the optional "Pillow" package; without it pages are
+    # stored as served.
+    return importlib.util.find_spec("PIL") is not None
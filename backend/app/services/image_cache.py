@@ -1,12 +1,28 @@
+import asyncio
+import contextlib
 import hashlib
 import json
 import os
+from collections import OrderedDict
 from dataclasses import dataclass
 from pathlib import Path
-from threading import RLock
+from threading import Lock, RLock
 from time import time
 from typing import Optional
 
+from app.services.blob_store import BlobStore, blob_store
+
+# Expired entries are swept from the index at most this often.
+TTL_SWEEP_INTERVAL = 600.0
+# Access times from cache hits are written back at most this often.
+ACCESS_FLUSH_INTERVAL = 60.0
+# The background maintenance task wakes up at least this often.
+MAINTENANCE_INTERVAL = 60.0
+# Files of different keys are guarded by this many striped locks.
+KEY_LOCK_STRIPES = 64
+# Present once the flat layout of older versions has been migrated.
+LAYOUT_MARKER = ".sharded"
+
 
 @dataclass
 class CachedImage:
@@ -14,56 +30,129 @@ class CachedImage:
     content_type: str
 
 
+@dataclass
+class _IndexEntry:
+    size: int
+    created_at: float
+    last_accessed: float
+    content_type: str
+    blob: Optional[str] = None
+
+
 class DiskImageCache:
-    """Simple disk-backed image cache with TTL + LRU eviction."""
+    """Simple disk-backed image cache with TTL + LRU eviction.
+
+    Entries are stored as ``<aa>/<bb>/<key>.bin`` and ``.json`` under the
+    cache directory, so no directory grows past a few entries. They are
+    indexed in memory in least-recently-used order, rebuilt from the
+    metadata files the first time the cache is used, so a put only touches
+    the entries it actually evicts.
+
+    The most recently read images are also kept in memory, up to a separate
+    byte budget, so hits on them skip the disk entirely.
+
+    With a blob store, each ``.bin`` is a hard link to a content-addressed
+    blob, so identical images behind different URLs, and pages that were
+    also downloaded, are kept on disk once. Entries whose blob a download
+    still links to cost the cache nothing, so size eviction leaves them be.
+
+    ``_lock`` only guards the in-memory state and is never held across file
+    I/O; reads and writes of an entry's files hold that key's lock instead.
+    The index is read from disk without it and swapped in once complete.
+    ``aget``/``aput`` run the disk work in a thread and leave eviction to
+    the maintenance task started with ``start``.
+    """
 
-    def __init__(self, cache_dir: Path) -> None:
+    def __init__(self, cache_dir: Path, blobs: Optional[BlobStore] = None) -> None:
         self.cache_dir = cache_dir
         self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.blobs = blobs
         self._lock = RLock()
+        self._key_locks = [Lock() for _ in range(KEY_LOCK_STRIPES)]
+        # Serializes the one-time index load, which runs without ``_lock``;
+        # ``_index`` stays None until the loaded index is swapped in.
+        self._load_lock = Lock()
+        self._index: Optional[OrderedDict[str, _IndexEntry]] = None
+        # Entries left in the flat layout of older versions are moved into
+        # their shards by the first maintenance pass, one key at a time.
+        self._migrate_lock = Lock()
+        self._migrated = (cache_dir / LAYOUT_MARKER).exists()
+        # Entries whose blob is also used by a download; kept out of the LRU.
+        self._pinned: dict[str, _IndexEntry] = {}
+        self._pinned_blobs: set[str] = set()
+        self._blob_refs: dict[str, int] = {}
+        # Links of detached entries whose files are not deleted yet.
+        self._unlinking: dict[str, int] = {}
+        self._total_size = 0
+        self._last_sweep = 0.0
+        # Keys read since their metadata was last written.
+        self._accessed: set[str] = set()
+        self._last_access_flush = time()
+        self._memory: OrderedDict[str, bytes] = OrderedDict()
+        self._memory_size = 0
+        # Limits from the latest ``aput``, applied by the maintenance task.
+        self._limits: Optional[tuple[int, int]] = None
+        self._wake: Optional[asyncio.Event] = None
+        self._maintenance: Optional[asyncio.Task] = None
+
+    @property
+    def total_size(self) -> int:
+        self._ensure_loaded()
+        with self._lock:
+            return self._total_size
+
+    @property
+    def memory_size(self) -> int:
+        with self._lock:
+            return self._memory_size
 
     def _cache_key(self, url: str, source: Optional[str]) -> str:
         normalized = f"{(source or '').strip().lower()}:{url.strip()}"
         return hashlib.sha256(normalized.encode("utf-8")).hexdigest()
 
     def _paths_for_key(self, key: str) -> tuple[Path, Path]:
-        return self.cache_dir / f"{key}.bin", self.cache_dir / f"{key}.json"
+        shard = self.cache_dir / key[:2] / key[2:4]
+        return shard / f"{key}.bin", shard / f"{key}.json"
+
+    def _key_lock(self, key: str) -> Lock:
+        return self._key_locks[int(key[:8], 16) % KEY_LOCK_STRIPES]
 
-    def get(self, url: str, source: Optional[str], ttl_hours: int) -> Optional[CachedImage]:
+    def get(
+        self,
+        url: str,
+        source: Optional[str],
+        ttl_hours: int,
+        memory_max_bytes: int = 0,
+    ) -> Optional[CachedImage]:
         if ttl_hours <= 0:
             return None
 
         key = self._cache_key(url, source)
-        data_path, meta_path = self._paths_for_key(key)
-
+        self._ensure_loaded()
         with self._lock:
-            if not data_path.exists() or not meta_path.exists():
-                return None
+            found = self._lookup(key, ttl_hours)
+        return self._load(key, found, memory_max_bytes)
 
-            try:
-                metadata = json.loads(meta_path.read_text(encoding="utf-8"))
-                created_at = float(metadata.get("created_at", 0))
-                if created_at <= 0:
-                    self._delete_entry(data_path, meta_path)
-                    return None
-
-                ttl_seconds = ttl_hours * 3600
-                now = time()
-                if now - created_at > ttl_seconds:
-                    self._delete_entry(data_path, meta_path)
-                    return None
-
-                content = data_path.read_bytes()
-                metadata["last_accessed"] = now
-                metadata["size"] = len(content)
-                meta_path.write_text(json.dumps(metadata), encoding="utf-8")
-                return CachedImage(
-                    content=content,
-                    content_type=str(metadata.get("content_type") or "image/jpeg"),
-                )
-            except Exception:
-                self._delete_entry(data_path, meta_path)
-                return None
+    async def aget(
+        self,
+        url: str,
+        source: Optional[str],
+        ttl_hours: int,
+        memory_max_bytes: int = 0,
+    ) -> Optional[CachedImage]:
+        if ttl_hours <= 0:
+            return None
+        if self._index is None:
+            # Still loading; wait for it in a thread, not on the loop.
+            return await asyncio.to_thread(self.get, url, source, ttl_hours, memory_max_bytes)
+
+        # Misses and memory hits are answered from the index on the loop.
+        key = self._cache_key(url, source)
+        with self._lock:
+            found = self._lookup(key, ttl_hours)
+        if found is None or found[1] is not None:
+            return self._load(key, found, memory_max_bytes)
+        return await asyncio.to_thread(self._load, key, found, memory_max_bytes)
 
     def put(
         self,
@@ -74,6 +163,7 @@ class DiskImageCache:
         content_type: Optional[str],
         max_bytes: int,
         ttl_hours: int,
+        memory_max_bytes: int = 0,
     ) -> None:
         if max_bytes <= 0 or ttl_hours <= 0:
             return
@@ -82,70 +172,491 @@ class DiskImageCache:
             return
 
         key = self._cache_key(url, source)
-        data_path, meta_path = self._paths_for_key(key)
-        now = time()
-        metadata = {
-            "url": url,
-            "source": source,
-            "created_at": now,
-            "last_accessed": now,
-            "content_type": content_type or "image/jpeg",
-            "size": len(content),
-        }
+        self._store(key, url, source, content, content_type, memory_max_bytes)
+        self._maintain((max_bytes, ttl_hours))
 
-        with self._lock:
-            data_path.write_bytes(content)
-            meta_path.write_text(json.dumps(metadata), encoding="utf-8")
-            self.evict(max_bytes=max_bytes, ttl_hours=ttl_hours)
+    async def aput(
+        self,
+        *,
+        url: str,
+        source: Optional[str],
+        content: bytes,
+        content_type: Optional[str],
+        max_bytes: int,
+        ttl_hours: int,
+        memory_max_bytes: int = 0,
+    ) -> None:
+        if max_bytes <= 0 or ttl_hours <= 0:
+            return
+
+        if len(content) > max_bytes:
+            return
+
+        key = self._cache_key(url, source)
+        await asyncio.to_thread(self._store, key, url, source, content, content_type, memory_max_bytes)
+        self._limits = (max_bytes, ttl_hours)
+        if self._wake is None:
+            await asyncio.to_thread(self._maintain, self._limits)
+        elif self._total_size > max_bytes:
+            self._wake.set()
 
     def evict(self, *, max_bytes: int, ttl_hours: int) -> None:
+        self._ensure_loaded()
+        victims = self._sweep(ttl_hours)
+        if max_bytes <= 0:
+            with self._lock:
+                victims += [(key, self._detach(key)) for key in list(self._index)]
+        else:
+            victims += self._shrink(max_bytes)
+        self._discard_all(victims)
+        if max_bytes > 0:
+            self.flush()
+
+    def flush(self) -> None:
+        """Write the access times recorded since the last flush."""
         with self._lock:
-            now = time()
-            ttl_seconds = max(ttl_hours, 0) * 3600
-            entries: list[tuple[Path, Path, dict]] = []
+            self._last_access_flush = time()
+            accessed, self._accessed = self._accessed, set()
+            if self._index is None:
+                return
+            pending = [(key, self._find(key)) for key in accessed]
+        for key, entry in pending:
+            with self._key_lock(key):
+                with self._lock:
+                    if entry is None or self._find(key) is not entry:
+                        continue
+                self._write_metadata(self._paths_for_key(key)[1], key, entry)
 
-            for meta_path in self.cache_dir.glob("*.json"):
-                data_path = self.cache_dir / f"{meta_path.stem}.bin"
-                if not data_path.exists():
-                    self._delete_entry(data_path, meta_path)
-                    continue
+    async def start(self) -> None:
+        """Start the background task that loads the index and evicts."""
+        if self._maintenance is not None:
+            return
+        self._wake = asyncio.Event()
+        self._wake.set()
+        self._maintenance = asyncio.create_task(self._run_maintenance())
+
+    async def stop(self) -> None:
+        if self._maintenance is not None:
+            self._maintenance.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await self._maintenance
+            self._maintenance = None
+        self._wake = None
+        await asyncio.to_thread(self.flush)
+
+    async def _run_maintenance(self) -> None:
+        while True:
+            with contextlib.suppress(asyncio.TimeoutError):
+                await asyncio.wait_for(self._wake.wait(), MAINTENANCE_INTERVAL)
+            self._wake.clear()
+            try:
+                await asyncio.to_thread(self._maintain, self._limits)
+            except Exception:
+                pass
+
+    def _maintain(self, limits: Optional[tuple[int, int]]) -> None:
+        now = time()
+        victims: list[tuple[str, _IndexEntry]] = []
+        self._ensure_loaded()
+        if not self._migrated:
+            self._migrate_flat_layout()
+        if limits is not None:
+            max_bytes, ttl_hours = limits
+            if now - self._last_sweep >= TTL_SWEEP_INTERVAL:
+                victims += self._sweep(ttl_hours)
+            victims += self._shrink(max_bytes)
+        self._discard_all(victims)
+        if now - self._last_access_flush >= ACCESS_FLUSH_INTERVAL:
+            self.flush()
+
+    def _find(self, key: str) -> Optional[_IndexEntry]:
+        entry = self._index.get(key)
+        return entry if entry is not None else self._pinned.get(key)
+
+    def _lookup(
+        self, key: str, ttl_hours: int
+    ) -> Optional[tuple[_IndexEntry, Optional[bytes], bool]]:
+        """Find ``key`` as ``(entry, content held in memory, still live)``.
+
+        Memory hits are touched here; expired entries are detached and left
+        for ``_load`` to delete.
+        """
+        entry = self._find(key)
+        if entry is None:
+            return None
+        if time() - entry.created_at > ttl_hours * 3600:
+            self._detach(key)
+            return entry, None, False
+        content = self._memory.get(key)
+        if content is not None:
+            self._touch(key, entry)
+        return entry, content, True
 
+    def _load(
+        self,
+        key: str,
+        found: Optional[tuple[_IndexEntry, Optional[bytes], bool]],
+        memory_max_bytes: int,
+    ) -> Optional[CachedImage]:
+        if found is None:
+            return None
+        entry, content, live = found
+        if not live:
+            self._discard(key, entry)
+            return None
+        if content is None:
+            content = self._read(key, entry, memory_max_bytes)
+            if content is None:
+                return None
+        return CachedImage(content=content, content_type=entry.content_type)
+
+    def _read(self, key: str, entry: _IndexEntry, memory_max_bytes: int) -> Optional[bytes]:
+        data_path, _ = self._paths_for_key(key)
+        with self._key_lock(key):
+            try:
+                content: Optional[bytes] = data_path.read_bytes()
+            except OSError:
+                content = None
+        with self._lock:
+            if self._find(key) is not entry:
+                # Replaced or evicted while we were reading.
+                return None
+            if content is None:
+                self._detach(key)
+            else:
+                # Hits only touch the index; the new access time reaches the
+                # metadata file with the next batch.
+                self._touch(key, entry)
+                self._remember(key, content, memory_max_bytes)
+        if content is None:
+            self._discard(key, entry)
+        return content
+
+    def _touch(self, key: str, entry: _IndexEntry) -> None:
+        entry.last_accessed = time()
+        if key in self._index:
+            self._index.move_to_end(key)
+        if key in self._memory:
+            self._memory.move_to_end(key)
+        self._accessed.add(key)
+
+    def _store(
+        self,
+        key: str,
+        url: str,
+        source: Optional[str],
+        content: bytes,
+        content_type: Optional[str],
+        memory_max_bytes: int,
+    ) -> None:
+        data_path, meta_path = self._paths_for_key(key)
+        now = time()
+        entry = _IndexEntry(
+            size=len(content),
+            created_at=now,
+            last_accessed=now,
+            content_type=content_type or "image/jpeg",
+        )
+
+        self._ensure_loaded()
+        with self._key_lock(key):
+            with self._lock:
+                previous = self._detach(key)
+            # Drop the old entry first so its blob loses the reference.
+            if previous is not None:
+                self._delete_files(key, previous.blob)
+                with self._lock:
+                    self._unlinked(previous)
+            data_path.parent.mkdir(parents=True, exist_ok=True)
+            if self.blobs is not None:
+                entry.blob = self.blobs.add_bytes(content, data_path)
+            else:
+                data_path.write_bytes(content)
+            self._write_metadata(meta_path, key, entry, url=url, source=source)
+            with self._lock:
+                self._add(key, entry)
+                self._remember(key, content, memory_max_bytes)
+
+    def _remember(self, key: str, content: bytes, memory_max_bytes: int) -> None:
+        self._forget(key)
+        if len(content) <= memory_max_bytes:
+            self._memory[key] = content
+            self._memory_size += len(content)
+        while self._memory_size > max(memory_max_bytes, 0):
+            _, evicted = self._memory.popitem(last=False)
+            self._memory_size -= len(evicted)
+
+    def _forget(self, key: str) -> None:
+        content = self._memory.pop(key, None)
+        if content is not None:
+            self._memory_size -= len(content)
+
+    def _entries(self) -> OrderedDict[str, _IndexEntry]:
+        self._ensure_loaded()
+        return self._index
+
+    def _ensure_loaded(self) -> None:
+        if self._index is not None:
+            return
+        with self._load_lock:
+            if self._index is not None:
+                return
+            loaded = self._scan_index()
+            with self._lock:
+                self._index = OrderedDict()
+                for key, entry in loaded:
+                    self._add(key, entry)
+
+    def _scan_index(self) -> list[tuple[str, _IndexEntry]]:
+        """Read every entry's metadata, oldest access first; runs without ``_lock``."""
+        loaded: list[tuple[str, _IndexEntry]] = []
+        for meta_path in self.cache_dir.glob("*/*/*.json"):
+            key = meta_path.stem
+            data_path, _ = self._paths_for_key(key)
+            try:
+                metadata = json.loads(meta_path.read_text(encoding="utf-8"))
+                entry = _entry_from_metadata(metadata, data_path.stat().st_size)
+            except Exception:
+                self._delete_files(key, None)
+                continue
+            if entry is None:
+                self._delete_files(key, metadata.get("blob"))
+                continue
+            loaded.append((key, entry))
+        loaded.sort(key=lambda item: item[1].last_accessed)
+        return loaded
+
+    def _migrate_flat_layout(self) -> None:
+        """Move entries of the old flat layout into their shards, once.
+
+        Runs after the index is loaded, so the cache serves while it works;
+        an entry not moved yet reads as a miss.
+        """
+        if not self._migrate_lock.acquire(blocking=False):
+            return
+        try:
+            pending: list[tuple[float, str, Optional[dict]]] = []
+            for meta_path in self.cache_dir.glob("*.json"):
                 try:
                     metadata = json.loads(meta_path.read_text(encoding="utf-8"))
+                    last_accessed = float(metadata.get("last_accessed", metadata.get("created_at", 0)))
                 except Exception:
-                    self._delete_entry(data_path, meta_path)
-                    continue
+                    metadata, last_accessed = None, 0.0
+                pending.append((last_accessed, meta_path.stem, metadata))
+            # Newest first, each placed in front of the last, so the oldest
+            # ends up least recently used.
+            for _, key, metadata in sorted(pending, key=lambda item: item[0], reverse=True):
+                self._migrate_entry(key, metadata)
+            # Data files nothing describes were never readable; drop them.
+            for data_path in self.cache_dir.glob("*.bin"):
+                self._release_flat(data_path, None)
+            with contextlib.suppress(OSError):
+                (self.cache_dir / LAYOUT_MARKER).touch()
+            self._migrated = True
+        finally:
+            self._migrate_lock.release()
 
-                created_at = float(metadata.get("created_at", 0))
-                if created_at <= 0:
-                    self._delete_entry(data_path, meta_path)
-                    continue
+    def _migrate_entry(self, key: str, metadata: Optional[dict]) -> None:
+        flat_data, flat_meta = self.cache_dir / f"{key}.bin", self.cache_dir / f"{key}.json"
+        data_path, meta_path = self._paths_for_key(key)
+        blob = metadata.get("blob") if metadata else None
+        with self._key_lock(key):
+            with self._lock:
+                superseded = self._find(key) is not None
+            entry = None
+            if metadata is not None and not superseded:
+                try:
+                    data_path.parent.mkdir(parents=True, exist_ok=True)
+                    # An interrupted migration may have moved the data already.
+                    if flat_data.exists():
+                        os.replace(flat_data, data_path)
+                    entry = _entry_from_metadata(metadata, data_path.stat().st_size)
+                    if entry is not None:
+                        os.replace(flat_meta, meta_path)
+                except (OSError, TypeError, ValueError):
+                    entry = None
+            if entry is None:
+                # Unreadable, or a put since startup already stored a newer copy.
+                self._release_flat(flat_data, blob)
+                with contextlib.suppress(OSError):
+                    flat_meta.unlink(missing_ok=True)
+                if not superseded:
+                    self._delete_files(key, blob)
+                return
+            with self._lock:
+                self._add(key, entry)
+                self._index.move_to_end(key, last=False)
+
+    def _release_flat(self, data_path: Path, blob: Optional[str]) -> None:
+        with contextlib.suppress(OSError):
+            if self.blobs is not None:
+                self.blobs.release(data_path, blob)
+            data_path.unlink(missing_ok=True)
+
+    def _add(self, key: str, entry: _IndexEntry) -> None:
+        self._index[key] = entry
+        blob = entry.blob
+        if blob is None:
+            self._total_size += entry.size
+            return
+        if blob not in self._blob_refs and blob not in self._pinned_blobs:
+            self._total_size += entry.size
+        self._blob_refs[blob] = self._blob_refs.get(blob, 0) + 1
+
+    def _detach(self, key: str) -> Optional[_IndexEntry]:
+        """Drop ``key`` from the in-memory state; its files stay for ``_discard``."""
+        entry = self._index.pop(key, None) or self._pinned.pop(key, None)
+        if entry is None:
+            return None
+        self._accessed.discard(key)
+        self._forget(key)
+        blob = entry.blob
+        if blob is None:
+            self._total_size -= entry.size
+        else:
+            self._unlinking[blob] = self._unlinking.get(blob, 0) + 1
+            self._blob_refs[blob] -= 1
+            if not self._blob_refs[blob]:
+                del self._blob_refs[blob]
+                if blob in self._pinned_blobs:
+                    self._pinned_blobs.discard(blob)
+                else:
+                    self._total_size -= entry.size
+        return entry
+
+    def _discard(self, key: str, entry: _IndexEntry) -> None:
+        with self._key_lock(key):
+            with self._lock:
+                owned = self._find(key) is not None
+            # Otherwise a newer put owns the files now.
+            if not owned:
+                self._delete_files(key, entry.blob)
+            with self._lock:
+                self._unlinked(entry)
+
+    def _unlinked(self, entry: _IndexEntry) -> None:
+        blob = entry.blob
+        if blob is None:
+            return
+        self._unlinking[blob] -= 1
+        if not self._unlinking[blob]:
+            del self._unlinking[blob]
 
-                if ttl_seconds > 0 and now - created_at > ttl_seconds:
-                    self._delete_entry(data_path, meta_path)
+    def _discard_all(self, victims: list[tuple[str, _IndexEntry]]) -> None:
+        for key, entry in victims:
+            self._discard(key, entry)
+
+    def _shrink(self, max_bytes: int) -> list[tuple[str, _IndexEntry]]:
+        """Detach least recently used entries until the cache fits ``max_bytes``.
+
+        Whether a download still links an entry's blob takes a ``stat``, so
+        it is checked between two short holds of ``_lock``.
+        """
+        victims: list[tuple[str, _IndexEntry]] = []
+        while True:
+            with self._lock:
+                if self._total_size <= max_bytes or not self._index:
+                    return victims
+                key, entry = next(iter(self._index.items()))
+            links = self._links(entry.blob)
+            with self._lock:
+                if not self._index or next(iter(self._index)) != key or self._index[key] is not entry:
+                    # Read or replaced meanwhile; look at the new head.
+                    continue
+                if self._used_by_downloads(entry, links):
+                    self._pin(key, entry)
                     continue
+                self._detach(key)
+                victims.append((key, entry))
 
-                size = data_path.stat().st_size
-                metadata["size"] = size
-                entries.append((data_path, meta_path, metadata))
+    def _used_by_downloads(self, entry: _IndexEntry, links: int) -> bool:
+        if entry.blob is None or self.blobs is None:
+            return False
+        if entry.blob in self._pinned_blobs:
+            return True
+        return self._linked_elsewhere(entry.blob, links)
 
-            if max_bytes <= 0:
-                for data_path, meta_path, _ in entries:
-                    self._delete_entry(data_path, meta_path)
-                return
+    def _pin(self, key: str, entry: _IndexEntry) -> None:
+        del self._index[key]
+        self._pinned[key] = entry
+        if entry.blob not in self._pinned_blobs:
+            self._pinned_blobs.add(entry.blob)
+            self._total_size -= entry.size
 
-            total_size = sum(int(item[2].get("size", 0)) for item in entries)
-            if total_size <= max_bytes:
-                return
+    def _sweep(self, ttl_hours: int) -> list[tuple[str, _IndexEntry]]:
+        victims: list[tuple[str, _IndexEntry]] = []
+        ttl_seconds = max(ttl_hours, 0) * 3600
+        with self._lock:
+            self._last_sweep = time()
+            if ttl_seconds > 0:
+                for key, entry in [*self._index.items(), *self._pinned.items()]:
+                    if self._last_sweep - entry.created_at > ttl_seconds:
+                        self._detach(key)
+                        victims.append((key, entry))
+            pinned_blobs = list(self._pinned_blobs)
+
+        # Pages whose download has since been deleted count again.
+        links = {blob: self._links(blob) for blob in pinned_blobs}
+        with self._lock:
+            released = {
+                blob
+                for blob, count in links.items()
+                if blob in self._pinned_blobs and not self._linked_elsewhere(blob, count)
+            }
+            for key, entry in list(self._pinned.items()):
+                if entry.blob in released:
+                    del self._pinned[key]
+                    self._index[key] = entry
+                    self._index.move_to_end(key, last=False)
+            for blob in released:
+                self._pinned_blobs.discard(blob)
+                entry = next(entry for entry in self._index.values() if entry.blob == blob)
+                self._total_size += entry.size
+        return victims
+
+    def _links(self, blob: Optional[str]) -> int:
+        if blob is None or self.blobs is None:
+            return 0
+        return self.blobs.references(self.blobs.path_for(blob))
 
-            entries.sort(key=lambda item: float(item[2].get("last_accessed", item[2].get("created_at", 0))))
-            for data_path, meta_path, metadata in entries:
-                if total_size <= max_bytes:
-                    break
-                total_size -= int(metadata.get("size", 0))
-                self._delete_entry(data_path, meta_path)
+    def _linked_elsewhere(self, blob: str, links: int) -> bool:
+        return links > self._blob_refs.get(blob, 0) + self._unlinking.get(blob, 0)
 
-    def _delete_entry(self, data_path: Path, meta_path: Path) -> None:
+    def _write_metadata(
+        self,
+        meta_path: Path,
+        key: str,
+        entry: _IndexEntry,
+        *,
+        url: Optional[str] = None,
+        source: Optional[str] = None,
+    ) -> None:
+        metadata = {
+            "created_at": entry.created_at,
+            "last_accessed": entry.last_accessed,
+            "content_type": entry.content_type,
+            "size": entry.size,
+            "blob": entry.blob,
+        }
+        if url is None:
+            try:
+                previous = json.loads(meta_path.read_text(encoding="utf-8"))
+                url, source = previous.get("url"), previous.get("source")
+            except Exception:
+                pass
+        metadata = {"url": url, "source": source, **metadata}
+        try:
+            meta_path.write_text(json.dumps(metadata), encoding="utf-8")
+        except OSError:
+            pass
+
+    def _delete_files(self, key: str, blob: Optional[str]) -> None:
+        data_path, meta_path = self._paths_for_key(key)
+        if self.blobs is not None:
+            try:
+                self.blobs.release(data_path, blob)
+            except Exception:
+                pass
         for path in (data_path, meta_path):
             try:
                 path.unlink(missing_ok=True)
@@ -153,6 +664,22 @@ class DiskImageCache:
                 pass
 
 
+def _entry_from_metadata(metadata: dict, size: int) -> Optional[_IndexEntry]:
+    created_at = float(metadata.get("created_at", 0) or 0)
+    if created_at <= 0:
+        return None
+    return _IndexEntry(
+        size=size,
+        created_at=created_at,
+        last_accessed=float(metadata.get("last_accessed", created_at)),
+        content_type=str(metadata.get("content_type") or "image/jpeg"),
+        blob=metadata.get("blob"),
+    )
+
+
 def build_default_cache_dir() -> Path:
     data_dir = Path(os.getenv("DATA_DIR", "./data"))
     return data_dir / "image-cache"
+
+
+image_cache = DiskImageCache(build_default_cache_dir(), blobs=blob_store)
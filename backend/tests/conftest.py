@@ -0,0 +1,27 @@
+import pytest
+from sqlalchemy.pool import StaticPool
+from sqlmodel import SQLModel, create_engine
+
+import app.services.download_manager as download_manager_module
+import app.services.download_progress as download_progress_module
+from app.services.blob_store import BlobStore
+
+
+@pytest.fixture
+def memory_engine(monkeypatch):
+    engine = create_engine(
+        "sqlite://",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool,
+    )
+    SQLModel.metadata.create_all(engine)
+    monkeypatch.setattr(download_manager_module, "engine", engine)
+    monkeypatch.setattr(download_progress_module, "engine", engine)
+    return engine
+
+
+@pytest.fixture(autouse=True)
+def isolated_blob_store(tmp_path_factory, monkeypatch):
+    store = BlobStore(tmp_path_factory.mktemp("blobs"))
+    monkeypatch.setattr(download_manager_module, "blob_store", store)
+    return store
@@ -0,0 +1,39 @@
+import asyncio
+from datetime import datetime
+from time import monotonic
+
+from app.services.bandwidth import BandwidthConfig, BandwidthLimiter
+
+
+def test_token_bucket_limits_throughput():
+    limiter = BandwidthLimiter(BandwidthConfig(max_bytes_per_sec=200_000))
+
+    async def scenario():
+        started = monotonic()
+        # 150 KB from an empty bucket at 200 KB/s takes about 0.75s.
+        for _ in range(15):
+            await limiter.consume(10_000)
+        return monotonic() - started
+
+    elapsed = asyncio.run(scenario())
+    assert 0.6 <= elapsed < 1.5
+
+
+def test_schedule_windows_and_interactive_yield():
+    config = BandwidthConfig.from_settings(
+        max_bytes_per_sec=1_000_000,
+        schedule=[
+            {"start": "22:00", "end": "06:00", "max_bytes_per_sec": 0},
+            {"start": "bogus"},
+        ],
+        interactive_share=0.5,
+    )
+    limiter = BandwidthLimiter(config)
+
+    assert len(config.schedule) == 1
+    assert limiter.current_rate(datetime(2024, 1, 1, 12, 0)) == 1_000_000
+    assert limiter.current_rate(datetime(2024, 1, 1, 23, 30)) == 0
+    assert limiter.current_rate(datetime(2024, 1, 2, 5, 59)) == 0
+
+    limiter.note_interactive()
+    assert limiter.current_rate(datetime(2024, 1, 1, 12, 0)) == 500_000
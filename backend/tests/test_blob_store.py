@@ -0,0 +1,88 @@
+import asyncio
+from pathlib import Path
+
+from app.services.blob_store import BlobStore
+from app.services.download_output import FolderOutput
+from app.services.download_storage import remove_download_path
+from app.services.image_cache import DiskImageCache
+
+PAGE = b"\xff\xd8\xff" + b"page" * 64
+
+
+def _put(cache: DiskImageCache, url: str, content: bytes, max_bytes: int = 4096) -> None:
+    cache.put(url=url, source="s", content=content, content_type="image/jpeg", max_bytes=max_bytes, ttl_hours=24)
+
+
+def _blobs(store: BlobStore) -> list[Path]:
+    return sorted(store.root.glob("*/*/*"))
+
+
+def test_same_image_under_two_urls_is_stored_once(tmp_path: Path):
+    store = BlobStore(tmp_path / "blobs")
+    cache = DiskImageCache(tmp_path / "cache", blobs=store)
+
+    _put(cache, "https://a.example.com/1.jpg", PAGE)
+    _put(cache, "https://b.example.com/1.jpg", PAGE)
+
+    (blob,) = _blobs(store)
+    assert store.references(blob) == 2
+    assert cache.get(url="https://b.example.com/1.jpg", source="s", ttl_hours=24).content == PAGE
+
+    # Pushing both entries out drops the blob with the last of them.
+    _put(cache, "https://c.example.com/big.jpg", b"x" * 4000)
+    assert cache.get(url="https://a.example.com/1.jpg", source="s", ttl_hours=24) is None
+    assert not blob.exists()
+
+
+def test_downloaded_page_links_the_cached_blob_and_pins_it(tmp_path: Path):
+    store = BlobStore(tmp_path / "blobs")
+    cache = DiskImageCache(tmp_path / "cache", blobs=store)
+    _put(cache, "https://cdn.example.com/1.jpg", PAGE)
+
+    chapter_dir = tmp_path / "downloads" / "Chapter_001"
+    output = FolderOutput(chapter_dir, blobs=store)
+    output.open()
+    part_file = chapter_dir / ".001.jpg.part"
+    part_file.write_bytes(PAGE)
+    asyncio.run(output.add_page(1, "jpg", part_file))
+
+    page = chapter_dir / "001.jpg"
+    (blob,) = _blobs(store)
+    assert page.stat().st_ino == blob.stat().st_ino
+    assert not part_file.exists()
+
+    # The download still uses the blob, so the cache keeps the entry even
+    # when squeezed for space.
+    _put(cache, "https://cdn.example.com/big.jpg", b"x" * 4000)
+    assert cache.get(url="https://cdn.example.com/1.jpg", source="s", ttl_hours=24) is not None
+
+    remove_download_path(chapter_dir)
+    store.collect()
+    assert blob.exists() and store.references(blob) == 1
+    cache.evict(max_bytes=0, ttl_hours=24)
+    assert _blobs(store) == []
+
+
+def test_collect_removes_blobs_nothing_links_to(tmp_path: Path):
+    store = BlobStore(tmp_path / "blobs")
+    kept = tmp_path / "kept.jpg"
+    dropped = tmp_path / "dropped.jpg"
+    store.add_bytes(PAGE, kept)
+    store.add_bytes(b"other", dropped)
+    dropped.unlink()
+
+    assert store.collect() == 1
+    (blob,) = _blobs(store)
+    assert blob.stat().st_ino == kept.stat().st_ino
+
+
+def test_adding_the_same_content_to_a_linked_target_leaves_no_extra_link(tmp_path: Path):
+    store = BlobStore(tmp_path / "blobs")
+    target = tmp_path / "x.bin"
+
+    first = store.add_bytes(PAGE, target)
+    second = store.add_bytes(PAGE, target)
+
+    assert first == second
+    assert [path.name for path in tmp_path.iterdir() if path.is_file()] == ["x.bin"]
+    assert store.references(store.path_for(first)) == 1
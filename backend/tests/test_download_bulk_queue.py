@@ -0,0 +1,145 @@
+import asyncio
+from types import SimpleNamespace
+
+from sqlalchemy import event
+from sqlmodel import Session, select
+
+from app.api import downloads as downloads_api
+from app.db.models import Download, Manga
+
+MANGA_URL = "https://example.com/manga"
+
+
+class FakeScraper:
+    def __init__(self, numbers):
+        self.numbers = numbers
+
+    async def chapters(self, manga_url):
+        return [
+            SimpleNamespace(chapter_number=number, url=f"{manga_url}/c{number}", title=f"Chapter {number}")
+            for number in self.numbers
+        ]
+
+
+class FakeRegistry:
+    def __init__(self, scraper):
+        self.scraper = scraper
+
+    def list_sources(self):
+        return [{"id": "test:en"}]
+
+    def get(self, source):
+        if source != "test:en":
+            raise KeyError(source)
+        return self.scraper
+
+
+class FakeManager:
+    def __init__(self):
+        self.enqueued = []
+
+    async def enqueue(self, download_id, priority, source=None):
+        self.enqueued.append((download_id, priority, source))
+
+
+def _setup(monkeypatch, numbers=()):
+    manager = FakeManager()
+    monkeypatch.setattr(downloads_api, "download_manager", manager)
+    monkeypatch.setattr(downloads_api, "registry", FakeRegistry(FakeScraper(numbers)))
+    return manager
+
+
+def _queue(engine, **fields):
+    payload = downloads_api.BulkQueueDownloadRequest(
+        manga_title="Test", manga_url=MANGA_URL, source="test", **fields
+    )
+    with Session(engine) as db:
+        return asyncio.run(downloads_api.queue_downloads_bulk(payload, db=db))
+
+
+def _chapter(number):
+    return {"chapter_number": number, "chapter_url": f"{MANGA_URL}/c{number}"}
+
+
+def test_list_mode_queues_each_chapter_once_in_one_insert(memory_engine, monkeypatch):
+    manager = _setup(monkeypatch)
+    inserts = []
+
+    @event.listens_for(memory_engine, "before_cursor_execute")
+    def record(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith("INSERT INTO DOWNLOAD"):
+            inserts.append(statement)
+
+    response = _queue(
+        memory_engine,
+        chapters=[_chapter(3), _chapter(1), _chapter(2), _chapter(1)],
+        priority="background",
+    )
+
+    assert len(inserts) == 1
+    assert len(response["download_ids"]) == 3
+    assert response["already_queued"] == []
+    with Session(memory_engine) as db:
+        rows = db.exec(select(Download).order_by(Download.id)).all()
+    assert [row.chapter_number for row in rows] == [1, 2, 3]
+    assert all(row.source == "test:en" and row.priority == "background" for row in rows)
+    assert all(row.total_pages == 0 and row.bytes_saved == 0 for row in rows)
+    assert manager.enqueued == [(row.id, "background", "test:en") for row in rows]
+
+
+def test_already_queued_chapters_are_reported_not_duplicated(memory_engine, monkeypatch):
+    manager = _setup(monkeypatch)
+    with Session(memory_engine) as db:
+        manga = Manga(title="Test", url=MANGA_URL, source="test:en")
+        db.add(manga)
+        db.flush()
+        pending = Download(manga_id=manga.id, chapter_number=1, status="pending")
+        done = Download(manga_id=manga.id, chapter_number=2, status="completed")
+        db.add_all([pending, done])
+        db.commit()
+        pending_id = pending.id
+
+    response = _queue(memory_engine, chapters=[_chapter(1), _chapter(2)])
+
+    assert response["already_queued"] == [pending_id]
+    assert len(response["download_ids"]) == 1
+    assert [download_id for download_id, _, _ in manager.enqueued] == response["download_ids"]
+    with Session(memory_engine) as db:
+        numbers = sorted(row.chapter_number for row in db.exec(select(Download)).all())
+    assert numbers == [1, 2, 2]
+
+
+def test_range_mode_skips_fractional_chapters_instead_of_truncating(memory_engine, monkeypatch):
+    _setup(monkeypatch, numbers=[12, 10.5, 11, 10, 9, 9.5, None])
+
+    response = _queue(memory_engine, start_chapter=10, end_chapter=11)
+
+    assert response["skipped_chapters"] == [10.5]
+    with Session(memory_engine) as db:
+        rows = db.exec(select(Download).order_by(Download.chapter_number)).all()
+    assert [(row.chapter_number, row.chapter_url) for row in rows] == [
+        (10, f"{MANGA_URL}/c10"),
+        (11, f"{MANGA_URL}/c11"),
+    ]
+
+
+def test_already_queued_chapters_are_raised_to_the_requested_priority(memory_engine, monkeypatch):
+    manager = _setup(monkeypatch)
+    with Session(memory_engine) as db:
+        manga = Manga(title="Test", url=MANGA_URL, source="test:en")
+        db.add(manga)
+        db.flush()
+        waiting = Download(manga_id=manga.id, chapter_number=1, source="test:en", status="pending", priority="background")
+        paused = Download(manga_id=manga.id, chapter_number=2, source="test:en", status="paused", priority="background")
+        urgent = Download(manga_id=manga.id, chapter_number=3, source="test:en", status="pending", priority="interactive")
+        db.add_all([waiting, paused, urgent])
+        db.commit()
+        waiting_id, paused_id, urgent_id = waiting.id, paused.id, urgent.id
+
+    _queue(memory_engine, chapters=[_chapter(1), _chapter(2), _chapter(3)], priority="normal")
+
+    with Session(memory_engine) as db:
+        priorities = {row.id: row.priority for row in db.exec(select(Download)).all()}
+    assert priorities == {waiting_id: "normal", paused_id: "normal", urgent_id: "interactive"}
+    # Only the pending row goes back on the queue; paused rows wait for resume.
+    assert manager.enqueued == [(waiting_id, "normal", "test:en")]
@@ -0,0 +1,160 @@
+import asyncio
+from pathlib import Path
+
+from sqlmodel import Session, select
+
+from app.api import downloads as downloads_api
+from app.db.models import Chapter, Download, Manga
+from app.services.download_manager import DownloadManager
+from app.services import blob_store as blob_store_module
+from app.services import download_manager as download_manager_module
+from app.services.blob_store import BlobStore
+from app.services.download_storage import remove_download_path
+
+
+def test_remove_download_path_clears_archive_leftovers(tmp_path: Path):
+    archive = tmp_path / "Chapter_001__untitled.cbz"
+    archive.write_bytes(b"x" * 10)
+    archive.with_name(f"{archive.name}.part").write_bytes(b"y" * 5)
+    staging = tmp_path / ".Chapter_001__untitled.pages"
+    staging.mkdir()
+    (staging / ".001.jpg.part").write_bytes(b"z" * 3)
+
+    assert remove_download_path(archive) == 18
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_removing_files_skips_failed_paths_and_sweeps_blobs_without_hashing(tmp_path: Path, monkeypatch):
+    store = BlobStore(tmp_path / "blobs")
+    folders = []
+    for number in (1, 2, 3):
+        folder = tmp_path / f"Chapter_{number:03d}"
+        folder.mkdir()
+        store.add_bytes(b"page%d" % number, folder / "001.jpg")
+        folders.append(folder)
+    locked = folders[1]
+
+    def hash_file(path):
+        raise AssertionError("pages should not be read back to delete them")
+
+    def remove(path):
+        if path == locked:
+            raise PermissionError(path)
+        return remove_download_path(path)
+
+    monkeypatch.setattr(blob_store_module, "_hash_file", hash_file)
+    monkeypatch.setattr(download_manager_module, "remove_download_path", remove)
+    manager = DownloadManager()
+    manager.blobs = store
+    removed = []
+    monkeypatch.setattr(manager.storage, "removed", lambda path, freed: removed.append(path))
+
+    asyncio.run(manager._remove_files([], [], folders))
+
+    assert removed == [folders[0], folders[2]]
+    assert [folder.exists() for folder in folders] == [False, True, False]
+    (blob,) = store.root.glob("*/*/*")
+    assert blob.stat().st_ino == (locked / "001.jpg").stat().st_ino
+
+
+def test_bulk_delete_commits_rows_first_and_removes_files_in_background(
+    memory_engine, tmp_path: Path, monkeypatch
+):
+    with Session(memory_engine) as db:
+        manga = Manga(title="Test", url="https://example.com/manga", source="test:en")
+        other = Manga(title="Other", url="https://example.com/other", source="test:en")
+        db.add_all([manga, other])
+        db.flush()
+        folders = []
+        for number in (1, 2):
+            folder = tmp_path / f"Chapter_{number:03d}"
+            folder.mkdir()
+            (folder / "001.jpg").write_bytes(b"\xff\xd8\xff")
+            folders.append(folder)
+            db.add(Chapter(manga_id=manga.id, chapter_number=number, url=f"u{number}", is_downloaded=True, downloaded_path=str(folder)))
+            db.add(Download(manga_id=manga.id, chapter_number=number, status="completed", file_path=str(folder)))
+        db.add(Download(manga_id=other.id, chapter_number=1, status="completed"))
+        db.commit()
+        manga_id = manga.id
+
+    async def scenario():
+        manager = DownloadManager()
+        monkeypatch.setattr(downloads_api, "download_manager", manager)
+        with Session(memory_engine) as db:
+            response = await downloads_api.delete_downloads(
+                downloads_api.BulkDeleteDownloadsRequest(manga_id=manga_id),
+                db=db,
+            )
+        # The rows are gone before the files are.
+        files_left = all(folder.exists() for folder in folders)
+        await asyncio.gather(*manager._removals)
+        return response, files_left
+
+    response, files_left_at_response = asyncio.run(scenario())
+
+    assert len(response["deleted"]) == 2
+    assert files_left_at_response
+    assert not any(folder.exists() for folder in folders)
+    with Session(memory_engine) as db:
+        assert len(db.exec(select(Download)).all()) == 1
+        chapters = db.exec(select(Chapter)).all()
+        assert [chapter.is_downloaded for chapter in chapters] == [False, False]
+        assert all(chapter.downloaded_path is None for chapter in chapters)
+
+
+class FakeScraper:
+    async def pages(self, chapter_url: str) -> list[str]:
+        return ["https://cdn.example.com/1.jpg"]
+
+    async def resolve_image(self, url: str) -> str:
+        return url
+
+
+def test_deleted_ids_do_not_cancel_a_new_row_that_reuses_them(memory_engine, tmp_path: Path, monkeypatch):
+    def add_download() -> int:
+        with Session(memory_engine) as db:
+            manga = db.exec(select(Manga)).first() or Manga(title="Test", url="https://example.com/manga", source="test:en")
+            db.add(manga)
+            db.flush()
+            download = Download(
+                manga_id=manga.id,
+                chapter_number=1,
+                chapter_url="https://example.com/manga/1",
+                source="test:en",
+                status="pending",
+            )
+            db.add(download)
+            db.commit()
+            return download.id
+
+    first_id = add_download()
+
+    async def scenario():
+        manager = DownloadManager()
+        monkeypatch.setattr(downloads_api, "download_manager", manager)
+        with Session(memory_engine) as db:
+            await downloads_api.delete_downloads(
+                downloads_api.BulkDeleteDownloadsRequest(download_ids=[first_id]),
+                db=db,
+            )
+        await asyncio.gather(*manager._removals)
+        # SQLite reuses the rowid of the deleted newest row.
+        second_id = add_download()
+        assert second_id == first_id
+        await manager.enqueue(second_id)
+        return manager, second_id
+
+    manager, second_id = asyncio.run(scenario())
+
+    assert second_id not in manager.cancelled_ids
+
+    # A download cancelled mid-run still ends with a final status and no lease.
+    manager.cancelled_ids.add(second_id)
+    settings = {"downloads.path": str(tmp_path)}
+    monkeypatch.setattr(manager, "_get_setting_value", lambda key, default: settings.get(key, default))
+    monkeypatch.setattr(manager, "_resolve_scraper", lambda source: FakeScraper())
+    asyncio.run(manager._run_download(second_id))
+    with Session(memory_engine) as db:
+        download = db.get(Download, second_id)
+        assert download.status == "cancelled"
+        assert download.lease_owner is None
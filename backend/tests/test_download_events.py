@@ -0,0 +1,48 @@
+import asyncio
+
+import app.services.download_events as download_events_module
+from app.services.download_events import DownloadEventHub
+from app.services.download_progress import ProgressReporter
+
+
+def test_slow_subscribers_drop_oldest_events(monkeypatch):
+    monkeypatch.setattr(download_events_module, "SUBSCRIBER_QUEUE_SIZE", 2)
+
+    async def scenario():
+        hub = DownloadEventHub()
+        queue = hub.subscribe()
+        for download_id in range(1, 4):
+            hub.publish("progress", download_id, downloaded_pages=download_id)
+        received = [queue.get_nowait()["id"] for _ in range(queue.qsize())]
+        hub.unsubscribe(queue)
+        hub.publish("progress", 4)
+        return received, queue.qsize()
+
+    received, leftover = asyncio.run(scenario())
+    assert received == [2, 3]
+    assert leftover == 0
+
+
+def test_reporter_publishes_every_page_without_writing_each_one(memory_engine, monkeypatch):
+    hub = DownloadEventHub()
+    monkeypatch.setattr("app.services.download_progress.download_events", hub)
+    writes = 0
+
+    async def scenario():
+        queue = hub.subscribe()
+        reporter = ProgressReporter(1, flush_pages=10)
+
+        def count_write(*, include_status: bool) -> None:
+            nonlocal writes
+            writes += 1
+
+        reporter._write = count_write
+        reporter.start(total_pages=3, file_path="/tmp/chapter")
+        for idx in range(1, 4):
+            reporter.page_completed(idx)
+        return [queue.get_nowait() for _ in range(queue.qsize())]
+
+    events = asyncio.run(scenario())
+    assert [event["downloaded_pages"] for event in events] == [0, 1, 2, 3]
+    assert events[-1]["progress"] == 1.0
+    assert writes == 1
@@ -0,0 +1,297 @@
+import asyncio
+import json
+import zipfile
+from pathlib import Path
+
+import httpx
+import pytest
+from sqlmodel import Session
+
+import app.services.download_manager as download_manager_module
+from app.db.models import Download, Manga
+from app.services.download_http import DownloadHttpClient
+from app.services.download_manager import DownloadManager
+from app.services.download_output import CbzOutput, FolderOutput
+from app.services.download_progress import ProgressReporter
+
+
+class FakeScraper:
+    def __init__(self, pages: list[str] | None = None) -> None:
+        self._pages = pages or []
+
+    async def pages(self, chapter_url: str) -> list[str]:
+        return self._pages
+
+    async def resolve_image(self, url: str) -> str:
+        return url
+
+
+def _create_download(engine, total_pages: int = 0, status: str = "downloading") -> int:
+    with Session(engine) as db:
+        manga = Manga(title="Test", url="https://example.com/manga", source="test:en")
+        db.add(manga)
+        db.flush()
+        download = Download(
+            manga_id=manga.id,
+            chapter_number=1,
+            chapter_url="https://example.com/manga/1",
+            source="test:en",
+            status=status,
+            total_pages=total_pages,
+        )
+        db.add(download)
+        db.commit()
+        return download.id
+
+
+def test_pages_download_in_parallel_and_keep_page_order(memory_engine, tmp_path: Path):
+    pages = [f"https://cdn.example.com/{idx}.png" for idx in range(1, 7)]
+    download_id = _create_download(memory_engine, len(pages))
+    in_flight = 0
+    peak = 0
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        nonlocal in_flight, peak
+        in_flight += 1
+        peak = max(peak, in_flight)
+        # Later pages answer first to prove ordering does not depend on timing.
+        await asyncio.sleep(0.01 * (10 - int(request.url.path.strip("/").split(".")[0])))
+        in_flight -= 1
+        return httpx.Response(200, content=request.url.path.encode(), headers={"content-type": "image/png"})
+
+    reporter = ProgressReporter(download_id, flush_pages=4)
+    commits = 0
+    original_write = reporter._write
+
+    def counting_write(*, include_status: bool) -> None:
+        nonlocal commits
+        commits += 1
+        original_write(include_status=include_status)
+
+    reporter._write = counting_write
+
+    async def scenario():
+        manager = DownloadManager()
+        manager.http = DownloadHttpClient(transport=httpx.MockTransport(handler))
+        reporter.start(total_pages=len(pages), file_path=str(tmp_path))
+        await manager._download_pages(
+            download_id=download_id,
+            scraper=FakeScraper(),
+            pages=pages,
+            output=FolderOutput(tmp_path),
+            page_concurrency=3,
+            reporter=reporter,
+        )
+        reporter.flush()
+        hosts = set(manager.http._clients)
+        await manager.http.aclose()
+        return hosts
+
+    hosts = asyncio.run(scenario())
+
+    assert hosts == {"https://cdn.example.com"}
+    assert peak == 3
+    assert sorted(p.name for p in tmp_path.iterdir()) == [f"{idx:03d}.png" for idx in range(1, 7)]
+    assert (tmp_path / "004.png").read_bytes() == b"/4.png"
+    with Session(memory_engine) as db:
+        download = db.get(Download, download_id)
+        assert download.downloaded_pages == 6
+        assert download.progress == 1.0
+    # start + one batch of four pages + final flush, not one commit per page.
+    assert commits == 3
+
+
+def test_failed_page_stream_leaves_no_partial_file(tmp_path: Path):
+    class BrokenStream(httpx.AsyncByteStream):
+        async def __aiter__(self):
+            yield b"partial-bytes"
+            raise httpx.ReadError("connection dropped")
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        return httpx.Response(200, stream=BrokenStream(), headers={"content-type": "image/jpeg"})
+
+    async def scenario():
+        manager = DownloadManager()
+        async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as client:
+            await manager._stream_page(
+                client=client,
+                url="https://cdn.example.com/1.jpg",
+                staging_dir=tmp_path,
+                idx=1,
+            )
+
+    with pytest.raises(httpx.ReadError):
+        asyncio.run(scenario())
+
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_cbz_output_appends_stored_pages_and_resumes_after_close(tmp_path: Path):
+    archive_path = tmp_path / "manga" / "Chapter_001__untitled.cbz"
+
+    async def add(output: CbzOutput, idx: int) -> None:
+        part_file = output.staging_dir / f".{idx:03d}.jpg.part"
+        part_file.write_bytes(b"\xff\xd8\xff" + bytes([idx]) * 32)
+        await output.add_page(idx, "jpg", part_file)
+
+    async def first_run():
+        output = CbzOutput(archive_path)
+        output.open()
+        await add(output, 2)
+        await add(output, 1)
+        output.close()
+
+    async def resumed_run():
+        output = CbzOutput(archive_path)
+        output.open()
+        assert output.completed_pages(total_pages=3) == {1, 2}
+        await add(output, 3)
+        output.finalize()
+
+    asyncio.run(first_run())
+    assert not archive_path.exists()
+    asyncio.run(resumed_run())
+
+    assert not archive_path.with_name(archive_path.name + ".part").exists()
+    with zipfile.ZipFile(archive_path) as archive:
+        infos = archive.infolist()
+        assert sorted(info.filename for info in infos) == ["001.jpg", "002.jpg", "003.jpg"]
+        assert all(info.compress_type == zipfile.ZIP_STORED for info in infos)
+        assert archive.read("003.jpg").endswith(bytes([3]) * 32)
+    assert sorted(p.name for p in archive_path.parent.iterdir()) == [archive_path.name]
+
+
+@pytest.mark.parametrize("output_format", ["folder", "cbz"])
+def test_run_download_completes_in_each_output_format(memory_engine, tmp_path: Path, monkeypatch, output_format):
+    pages = [f"https://cdn.example.com/{idx}.jpg" for idx in range(1, 4)]
+    download_id = _create_download(memory_engine, status="pending")
+    settings = {"downloads.path": str(tmp_path), "downloads.format": output_format}
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        return httpx.Response(200, content=b"\xff\xd8\xff" + request.url.path.encode())
+
+    async def scenario():
+        manager = DownloadManager()
+        manager.http = DownloadHttpClient(transport=httpx.MockTransport(handler))
+        monkeypatch.setattr(manager, "_get_setting_value", lambda key, default: settings.get(key, default))
+        monkeypatch.setattr(manager, "_resolve_scraper", lambda source: FakeScraper(pages))
+        await manager._run_download(download_id)
+        await manager.http.aclose()
+
+    asyncio.run(scenario())
+
+    with Session(memory_engine) as db:
+        download = db.get(Download, download_id)
+        assert download.status == "completed", download.error
+        assert download.downloaded_pages == 3
+        assert download.lease_owner is None
+        file_path = Path(download.file_path)
+
+    if output_format == "cbz":
+        assert file_path.suffix == ".cbz"
+        with zipfile.ZipFile(file_path) as archive:
+            assert sorted(archive.namelist()) == ["001.jpg", "002.jpg", "003.jpg"]
+    else:
+        assert sorted(p.name for p in file_path.iterdir()) == ["001.jpg", "002.jpg", "003.jpg"]
+
+
+def test_page_resolution_overlaps_image_transfer(memory_engine, tmp_path: Path):
+    pages = [f"https://example.com/chapter/{idx}.html" for idx in range(1, 7)]
+    download_id = _create_download(memory_engine, len(pages))
+    fetches_in_flight = 0
+    resolved_during_fetch = 0
+
+    class HtmlScraper(FakeScraper):
+        async def resolve_image(self, url: str) -> str:
+            nonlocal resolved_during_fetch
+            await asyncio.sleep(0.01)
+            if fetches_in_flight:
+                resolved_during_fetch += 1
+            return url.replace("example.com/chapter", "cdn.example.com").replace(".html", ".jpg")
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        nonlocal fetches_in_flight
+        fetches_in_flight += 1
+        await asyncio.sleep(0.03)
+        fetches_in_flight -= 1
+        return httpx.Response(200, content=b"\xff\xd8\xff")
+
+    async def scenario():
+        manager = DownloadManager()
+        manager.http = DownloadHttpClient(transport=httpx.MockTransport(handler))
+        await manager._download_pages(
+            download_id=download_id,
+            scraper=HtmlScraper(),
+            pages=pages,
+            output=FolderOutput(tmp_path),
+            page_concurrency=2,
+            reporter=ProgressReporter(download_id),
+        )
+        await manager.http.aclose()
+
+    asyncio.run(scenario())
+
+    assert resolved_during_fetch >= 3
+    assert sorted(p.name for p in tmp_path.iterdir()) == [f"{idx:03d}.jpg" for idx in range(1, 7)]
+
+
+def test_transient_errors_are_retried_and_failed_pages_refetched_on_resume(
+    memory_engine, tmp_path: Path, monkeypatch
+):
+    monkeypatch.setattr(download_manager_module, "RETRY_BASE_DELAY", 0.001)
+    pages = [f"https://cdn.example.com/{idx}.jpg" for idx in range(1, 5)]
+    download_id = _create_download(memory_engine, status="pending")
+    settings = {"downloads.path": str(tmp_path)}
+    requests: list[str] = []
+    flaky_failures = {"/2.jpg": 2}
+    broken = {"/3.jpg"}
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        path = request.url.path
+        requests.append(path)
+        if flaky_failures.get(path):
+            flaky_failures[path] -= 1
+            return httpx.Response(503)
+        if path in broken:
+            return httpx.Response(404)
+        return httpx.Response(200, content=b"\xff\xd8\xff" + path.encode())
+
+    async def run_once():
+        manager = DownloadManager()
+        manager.http = DownloadHttpClient(transport=httpx.MockTransport(handler))
+        monkeypatch.setattr(manager, "_get_setting_value", lambda key, default: settings.get(key, default))
+        monkeypatch.setattr(manager, "_resolve_scraper", lambda source: FakeScraper(pages))
+        await manager._run_download(download_id)
+        await manager.http.aclose()
+
+    asyncio.run(run_once())
+
+    with Session(memory_engine) as db:
+        download = db.get(Download, download_id)
+        assert download.status == "failed"
+        assert json.loads(download.failed_pages) == [3]
+        assert download.downloaded_pages == 3
+        download.status = "pending"
+        db.add(download)
+        db.commit()
+    # Page 2 needed two retries; page 3 was tried once per pass (404 is not retried).
+    assert requests.count("/2.jpg") == 3
+    assert requests.count("/3.jpg") == 2
+
+    broken.clear()
+    requests.clear()
+    asyncio.run(run_once())
+
+    assert requests == ["/3.jpg"]
+    with Session(memory_engine) as db:
+        download = db.get(Download, download_id)
+        assert download.status == "completed"
+        assert download.failed_pages is None
+
+
+def test_retry_delay_honours_retry_after():
+    response = httpx.Response(429, headers={"retry-after": "7"}, request=httpx.Request("GET", "https://x"))
+    exc = httpx.HTTPStatusError("slow down", request=response.request, response=response)
+
+    assert download_manager_module._retry_delay(0, exc) == 7.0
+    assert 0.5 <= download_manager_module._retry_delay(0, httpx.ReadTimeout("t")) <= 1.0
@@ -1,6 +1,7 @@
 from pathlib import Path
 
 from app.services.download_manager import DownloadManager
+from app.services.download_output import FolderOutput
 
 
 def test_download_path_structure_and_collision(tmp_path: Path):
@@ -27,3 +28,34 @@ def test_download_path_structure_and_collision(tmp_path: Path):
         download_id=22,
     )
     assert chapter_dir_2.as_posix().endswith("my-manga-test/Chapter_001__i-am-shy__22")
+
+
+def test_resume_reuses_chapter_dir_and_detects_completed_pages(tmp_path: Path):
+    manager = DownloadManager()
+
+    chapter_dir = manager._resolve_chapter_dir(
+        root=tmp_path,
+        manga_title="Resume",
+        chapter_number=3,
+        chapter_title=None,
+        download_id=5,
+    )
+    (chapter_dir / "001.jpg").write_bytes(b"\xff\xd8\xff\xe0jpeg-data")
+    (chapter_dir / "002.png").write_bytes(b"\x89PNG\r\n\x1a\npng-data")
+    (chapter_dir / "003.jpg").write_bytes(b"")
+    (chapter_dir / "004.webp").write_bytes(b"<html>error page</html>")
+    (chapter_dir / ".005.jpg.part").write_bytes(b"\xff\xd8\xff")
+    (chapter_dir / "009.jpg").write_bytes(b"\xff\xd8\xff\xe0beyond-total")
+
+    resumed_dir = manager._resolve_chapter_dir(
+        root=tmp_path,
+        manga_title="Resume",
+        chapter_number=3,
+        chapter_title=None,
+        download_id=5,
+        existing_path=str(chapter_dir),
+    )
+    assert resumed_dir == chapter_dir
+
+    assert FolderOutput(chapter_dir).completed_pages(total_pages=6) == {1, 2}
+    assert not (chapter_dir / ".005.jpg.part").exists()
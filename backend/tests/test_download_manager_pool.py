@@ -0,0 +1,109 @@
+import asyncio
+from datetime import datetime, timedelta
+
+from sqlmodel import Session
+
+from app.db.models import Download, Manga
+from app.services.download_manager import DownloadManager
+
+
+def test_worker_pool_runs_downloads_concurrently_and_resizes(memory_engine, monkeypatch):
+    async def scenario():
+        manager = DownloadManager()
+        settings = {"downloads.max_concurrent": 3, "downloads.per_source_concurrency": 3}
+        monkeypatch.setattr(manager, "_get_setting_value", lambda key, default: settings.get(key, default))
+
+        running: set[int] = set()
+        peak = 0
+        release = asyncio.Event()
+
+        async def fake_run(download_id: int) -> None:
+            nonlocal peak
+            running.add(download_id)
+            peak = max(peak, len(running))
+            await release.wait()
+            running.discard(download_id)
+
+        monkeypatch.setattr(manager, "_run_download", fake_run)
+
+        await manager.start()
+        assert len(manager.workers) == 3
+
+        for download_id in range(1, 6):
+            await manager.enqueue(download_id)
+        await asyncio.sleep(0.05)
+        assert peak == 3
+
+        manager.set_max_concurrent(1)
+        release.set()
+        await manager.queue.join()
+        await asyncio.sleep(0.05)
+        assert len(manager.workers) == 1
+
+        manager.set_max_concurrent(4)
+        assert len(manager.workers) == 4
+        await manager.stop()
+        assert not manager.workers
+
+    asyncio.run(scenario())
+
+
+def _add_downloads(engine, *rows: dict) -> list[int]:
+    with Session(engine) as db:
+        manga = Manga(title="Queue", url="https://example.com/queue", source="test:en")
+        db.add(manga)
+        db.flush()
+        downloads = [
+            Download(manga_id=manga.id, chapter_number=number, **fields)
+            for number, fields in enumerate(rows, start=1)
+        ]
+        db.add_all(downloads)
+        db.commit()
+        return [download.id for download in downloads]
+
+
+def test_start_rehydrates_pending_and_interrupted_downloads(memory_engine, monkeypatch):
+    expired = datetime.utcnow() - timedelta(minutes=5)
+    pending_id, interrupted_id, paused_id, completed_id = _add_downloads(
+        memory_engine,
+        {"status": "pending"},
+        {"status": "downloading", "lease_owner": "crashed-process", "lease_expires_at": expired},
+        {"status": "paused"},
+        {"status": "completed"},
+    )
+
+    async def scenario():
+        manager = DownloadManager()
+        monkeypatch.setattr(manager, "_get_setting_value", lambda key, default: default)
+        started: list[int] = []
+
+        async def fake_run(download_id: int) -> None:
+            if manager._claim(download_id):
+                started.append(download_id)
+
+        monkeypatch.setattr(manager, "_run_download", fake_run)
+        await manager.start()
+        await manager.queue.join()
+        await manager.stop()
+        return started
+
+    started = asyncio.run(scenario())
+
+    assert sorted(started) == [pending_id, interrupted_id]
+    with Session(memory_engine) as db:
+        assert db.get(Download, paused_id).status == "paused"
+        assert db.get(Download, completed_id).status == "completed"
+        # stop() hands claimed-but-unfinished jobs back to the queue.
+        assert db.get(Download, interrupted_id).status == "pending"
+        assert db.get(Download, interrupted_id).lease_owner is None
+
+
+def test_claim_prevents_a_second_runner(memory_engine):
+    (download_id,) = _add_downloads(memory_engine, {"status": "pending"})
+
+    first = DownloadManager()
+    second = DownloadManager()
+
+    assert first._claim(download_id) is True
+    assert second._claim(download_id) is False
+    assert first._claim(download_id) is True
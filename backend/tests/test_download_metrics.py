@@ -0,0 +1,122 @@
+import asyncio
+from pathlib import Path
+
+import httpx
+from sqlmodel import Session
+
+import app.services.download_manager as download_manager_module
+from app.db.models import Download, Manga
+from app.services.download_http import DownloadHttpClient
+from app.services.download_manager import DownloadManager
+from app.services.download_metrics import DownloadMetrics, DownloadSample, PageSample
+
+
+class FakeScraper:
+    def __init__(self, pages: list[str]) -> None:
+        self._pages = pages
+
+    async def pages(self, chapter_url: str) -> list[str]:
+        return self._pages
+
+    async def resolve_image(self, url: str) -> str:
+        return url.replace("reader.example.com", "cdn.example.com")
+
+
+def test_run_download_records_page_and_chapter_metrics(memory_engine, tmp_path: Path, monkeypatch):
+    monkeypatch.setattr(download_manager_module, "RETRY_BASE_DELAY", 0.001)
+    pages = [f"https://reader.example.com/{idx}.jpg" for idx in range(1, 4)]
+    with Session(memory_engine) as db:
+        manga = Manga(title="Test", url="https://example.com/manga", source="test:en")
+        db.add(manga)
+        db.flush()
+        download = Download(
+            manga_id=manga.id,
+            chapter_number=1,
+            chapter_url="https://example.com/manga/1",
+            source="test:en",
+            status="pending",
+        )
+        db.add(download)
+        db.commit()
+        download_id = download.id
+    flaky_failures = {"/2.jpg": 1}
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        if flaky_failures.get(request.url.path):
+            flaky_failures[request.url.path] -= 1
+            return httpx.Response(503)
+        return httpx.Response(200, content=b"\xff\xd8\xff" + b"x" * 97)
+
+    async def scenario():
+        manager = DownloadManager()
+        manager.http = DownloadHttpClient(transport=httpx.MockTransport(handler))
+        settings = {"downloads.path": str(tmp_path)}
+        monkeypatch.setattr(manager, "_get_setting_value", lambda key, default: settings.get(key, default))
+        monkeypatch.setattr(manager, "_resolve_scraper", lambda source: FakeScraper(pages))
+        await manager._run_download(download_id)
+        await manager.http.aclose()
+        return manager.metrics.summary()
+
+    summary = asyncio.run(scenario())
+
+    assert summary["pages"]["completed"] == 3
+    assert summary["pages"]["failed"] == 0
+    assert summary["pages"]["retries"] == 1
+    assert summary["pages"]["bytes"] == 300
+    assert summary["pages"]["ttfb_seconds"]["count"] == 3
+    assert list(summary["hosts"]) == ["cdn.example.com"]
+    assert summary["hosts"]["cdn.example.com"]["bytes"] == 300
+    recent = summary["downloads"]["recent"]
+    assert [(item["id"], item["status"], item["pages"], item["bytes"]) for item in recent] == [
+        (download_id, "completed", 3, 300)
+    ]
+
+
+def test_summary_only_aggregates_samples_inside_the_window():
+    metrics = DownloadMetrics(window_seconds=60)
+    metrics.record_page(PageSample(download_id=1, host="old", ok=True, bytes=10, recorded_at=1000.0))
+    for ttfb in (0.1, 0.2, 0.3, 0.4):
+        metrics.record_page(
+            PageSample(download_id=2, host="cdn", ok=True, bytes=50, ttfb_seconds=ttfb, transfer_seconds=0.5, recorded_at=1100.0)
+        )
+    metrics.record_page(PageSample(download_id=2, host="cdn", ok=False, retries=3, recorded_at=1100.0))
+    metrics.record_download(DownloadSample(2, "test:en", "failed", 4, 200, 2.0, recorded_at=1100.0))
+
+    summary = metrics.summary(now=1120.0)
+
+    assert summary["pages"]["completed"] == 4
+    assert summary["pages"]["failed"] == 1
+    assert summary["pages"]["retries"] == 3
+    assert summary["pages"]["ttfb_seconds"]["p50"] == 0.3
+    assert summary["hosts"] == {"cdn": {"pages": 4, "bytes": 200, "bytes_per_second": 100, "ttfb_p50": 0.3}}
+    assert summary["downloads"]["failed"] == 1
+    assert summary["downloads"]["recent"][0]["bytes_per_second"] == 100
+
+
+def test_stream_page_times_bandwidth_waits_apart_from_transfer(tmp_path: Path, monkeypatch):
+    def handler(request: httpx.Request) -> httpx.Response:
+        return httpx.Response(200, content=b"\xff\xd8\xff" + b"x" * 97)
+
+    async def scenario():
+        manager = DownloadManager()
+
+        async def slow_consume(amount: int) -> None:
+            await asyncio.sleep(0.05)
+
+        monkeypatch.setattr(manager.bandwidth, "consume", slow_consume)
+        sample = PageSample(download_id=1, host="cdn.example.com", ok=False)
+        async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as client:
+            await manager._stream_page(
+                client=client,
+                url="https://cdn.example.com/1.jpg",
+                staging_dir=tmp_path,
+                idx=1,
+                sample=sample,
+            )
+        return sample
+
+    sample = asyncio.run(scenario())
+
+    assert sample.throttle_seconds >= 0.05
+    assert sample.transfer_seconds < 0.05
+    assert sample.bytes == 100
@@ -0,0 +1,83 @@
+import asyncio
+
+from app.services.download_queue import DownloadQueue
+
+
+def _drain(queue: DownloadQueue) -> list[int]:
+    async def scenario():
+        items = []
+        while not queue.empty():
+            items.append(await queue.get())
+            queue.task_done(items[-1])
+        return items
+
+    return asyncio.run(scenario())
+
+
+def test_higher_lanes_jump_ahead_and_duplicates_promote():
+    queue = DownloadQueue()
+    queue.put_nowait(1, "background")
+    queue.put_nowait(2, "normal")
+    queue.put_nowait(3, "interactive")
+    queue.put_nowait(4, "normal")
+    queue.put_nowait(4, "interactive")
+    queue.put_nowait(3, "background")
+
+    assert queue.qsize() == 4
+    assert _drain(queue) == [3, 4, 2, 1]
+
+
+def test_lower_lanes_are_not_starved():
+    queue = DownloadQueue()
+    queue.put_nowait(100, "background")
+    for download_id in range(1, 21):
+        queue.put_nowait(download_id, "interactive")
+
+    order = _drain(queue)
+    assert order.index(100) < 20
+
+
+def test_sources_take_turns_and_respect_their_limit():
+    async def scenario():
+        queue = DownloadQueue(source_limit=1)
+        for download_id in range(1, 5):
+            queue.put_nowait(download_id, "normal", "busy:en")
+        queue.put_nowait(10, "normal", "quiet:en")
+        queue.put_nowait(11, "normal", "quiet:en")
+
+        first = await queue.get()
+        second = await queue.get()
+        # Both sources are at their limit, so a third worker has to wait.
+        blocked = asyncio.create_task(queue.get())
+        await asyncio.sleep(0)
+        assert not blocked.done()
+
+        queue.task_done(first)
+        third = await blocked
+        # Interactive work is never held back by the per-source limit.
+        queue.put_nowait(20, "interactive", "quiet:en")
+        fourth = await queue.get()
+        return [first, second, third, fourth], queue.running_per_source()
+
+    order, running = asyncio.run(scenario())
+
+    assert order == [1, 10, 2, 20]
+    assert running == {"busy:en": 1, "quiet:en": 2}
+
+
+def test_requeuing_a_running_id_does_not_leak_its_source_slot():
+    async def scenario():
+        queue = DownloadQueue(source_limit=2)
+        queue.put_nowait(1, "normal", "a")
+        first = await queue.get()
+        # Resumed while still running: the worker drops the duplicate.
+        queue.put_nowait(1, "normal", "a")
+        duplicate = await queue.get()
+        queue.task_done(duplicate)
+        queue.task_done(first)
+        return first, duplicate, queue.running_per_source()
+
+    first, duplicate, running = asyncio.run(scenario())
+
+    assert first == duplicate == 1
+    assert running == {}
@@ -0,0 +1,118 @@
+import asyncio
+from pathlib import Path
+
+import httpx
+from sqlmodel import Session
+
+import app.services.download_storage as download_storage_module
+from app.db.models import Download, Manga
+from app.services.download_http import DownloadHttpClient
+from app.services.download_manager import DownloadManager
+from app.services.download_storage import DownloadStorage
+
+
+class FakeScraper:
+    def __init__(self, pages: list[str]) -> None:
+        self._pages = pages
+
+    async def pages(self, chapter_url: str) -> list[str]:
+        return self._pages
+
+    async def resolve_image(self, url: str) -> str:
+        return url
+
+
+def test_usage_is_scanned_once_then_kept_up_to_date(tmp_path: Path, monkeypatch):
+    (tmp_path / "manga" / "ch1").mkdir(parents=True)
+    (tmp_path / "manga" / "ch1" / "001.jpg").write_bytes(b"x" * 100)
+    scans = 0
+    original_path_size = download_storage_module.path_size
+
+    def counting_path_size(path: Path) -> int:
+        nonlocal scans
+        scans += 1
+        return original_path_size(path)
+
+    monkeypatch.setattr(download_storage_module, "path_size", counting_path_size)
+    storage = DownloadStorage()
+
+    assert storage.usage(tmp_path) == 100
+    storage.page_written(1, 50)
+    assert storage.usage(tmp_path) == 150
+    storage.removed(tmp_path / "manga" / "ch1", 100)
+    assert storage.usage(tmp_path) == 50
+    storage.removed(Path("/elsewhere"), 50)
+    assert storage.usage(tmp_path) == 50
+    assert scans == 1
+
+
+def test_reservations_count_against_the_quota(tmp_path: Path):
+    storage = DownloadStorage()
+
+    assert storage.reserve(1, tmp_path, 600, quota=1000) is None
+    refused = storage.reserve(2, tmp_path, 600, quota=1000)
+    assert refused is not None and refused.startswith("Download quota exceeded")
+
+    # Written pages move from the reservation into the usage total.
+    storage.page_written(1, 400)
+    assert storage.reserved() == 200
+    assert storage.usage(tmp_path) == 400
+
+    storage.release(1)
+    assert storage.reserve(2, tmp_path, 600, quota=1000) is None
+
+
+def test_estimate_follows_observed_page_sizes():
+    storage = DownloadStorage()
+    before = storage.estimate(10)
+
+    for _ in range(200):
+        storage.page_written(1, 1000)
+
+    assert storage.estimate(10) < before
+    assert 1000 <= storage.average_page_bytes < 2000
+
+
+def test_run_download_refuses_a_chapter_over_quota(memory_engine, tmp_path: Path, monkeypatch):
+    pages = [f"https://cdn.example.com/{idx}.jpg" for idx in range(1, 4)]
+    with Session(memory_engine) as db:
+        manga = Manga(title="Test", url="https://example.com/manga", source="test:en")
+        db.add(manga)
+        db.flush()
+        download = Download(
+            manga_id=manga.id,
+            chapter_number=1,
+            chapter_url="https://example.com/manga/1",
+            source="test:en",
+            status="pending",
+        )
+        db.add(download)
+        db.commit()
+        download_id = download.id
+    requests: list[str] = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        requests.append(request.url.path)
+        return httpx.Response(200, content=b"\xff\xd8\xff")
+
+    async def scenario():
+        manager = DownloadManager()
+        manager.http = DownloadHttpClient(transport=httpx.MockTransport(handler))
+        settings = {"downloads.path": str(tmp_path), "downloads.quota_bytes": 1024}
+        monkeypatch.setattr(manager, "_get_setting_value", lambda key, default: settings.get(key, default))
+        monkeypatch.setattr(manager, "_resolve_scraper", lambda source: FakeScraper(pages))
+        await manager._run_download(download_id)
+        await manager.http.aclose()
+        return manager.storage.reserved()
+
+    reserved = asyncio.run(scenario())
+
+    assert requests == []
+    assert reserved == 0
+    # Nothing was created for the refused chapter.
+    assert list(tmp_path.iterdir()) == []
+    with Session(memory_engine) as db:
+        download = db.get(Download, download_id)
+        assert download.status == "failed"
+        assert download.error.startswith("Download quota exceeded")
+        assert download.lease_owner is None
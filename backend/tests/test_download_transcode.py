@@ -0,0 +1,110 @@
+import asyncio
+import io
+from pathlib import Path
+
+import httpx
+import pytest
+from sqlmodel import Session
+
+from app.db.models import Download, Manga
+from app.services.download_http import DownloadHttpClient
+from app.services.download_manager import DownloadManager
+from app.services.download_transcode import PageTranscoder, TranscodeConfig
+
+Image = pytest.importorskip("PIL.Image")
+
+
+class FakeScraper:
+    def __init__(self, pages: list[str]) -> None:
+        self._pages = pages
+
+    async def pages(self, chapter_url: str) -> list[str]:
+        return self._pages
+
+    async def resolve_image(self, url: str) -> str:
+        return url
+
+
+def _uncompressed_png() -> bytes:
+    image = Image.new("RGB", (320, 240))
+    for x in range(0, 320, 8):
+        image.paste((x % 256, 40, 200 - x % 200), (x, 0, x + 8, 240))
+    buffer = io.BytesIO()
+    image.save(buffer, format="PNG", compress_level=0)
+    return buffer.getvalue()
+
+
+def test_transcoder_only_keeps_smaller_encodings(tmp_path: Path):
+    png_page = tmp_path / ".001.png.part"
+    png_page.write_bytes(_uncompressed_png())
+    original_size = png_page.stat().st_size
+    jpeg_page = tmp_path / ".002.jpg.part"
+    jpeg_page.write_bytes(b"\xff\xd8\xff not really a jpeg")
+
+    async def scenario():
+        transcoder = PageTranscoder(max_workers=1)
+        try:
+            lossless = await transcoder.transcode(png_page, "png", TranscodeConfig(mode="png"))
+            skipped = await transcoder.transcode(jpeg_page, "jpg", TranscodeConfig(mode="png"))
+            unreadable = await transcoder.transcode(jpeg_page, "jpg", TranscodeConfig(mode="webp"))
+        finally:
+            transcoder.shutdown()
+        return lossless, skipped, unreadable
+
+    lossless, skipped, unreadable = asyncio.run(scenario())
+
+    assert lossless[0] == png_page and lossless[1] == "png"
+    assert 0 < lossless[2] == original_size - png_page.stat().st_size
+    assert skipped == (jpeg_page, "jpg", 0)
+    assert unreadable == (jpeg_page, "jpg", 0)
+    assert sorted(path.name for path in tmp_path.iterdir()) == [".001.png.part", ".002.jpg.part"]
+
+
+def test_run_download_stores_webp_pages_and_reports_bytes_saved(memory_engine, tmp_path: Path, monkeypatch):
+    pages = [f"https://cdn.example.com/{idx}.png" for idx in range(1, 3)]
+    body = _uncompressed_png()
+    with Session(memory_engine) as db:
+        manga = Manga(title="Test", url="https://example.com/manga", source="test:en")
+        db.add(manga)
+        db.flush()
+        download = Download(
+            manga_id=manga.id,
+            chapter_number=1,
+            chapter_url="https://example.com/manga/1",
+            source="test:en",
+            status="pending",
+        )
+        db.add(download)
+        db.commit()
+        download_id = download.id
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        return httpx.Response(200, content=body, headers={"content-type": "image/png"})
+
+    async def scenario():
+        manager = DownloadManager()
+        manager.http = DownloadHttpClient(transport=httpx.MockTransport(handler))
+        manager.transcoder = PageTranscoder(max_workers=1)
+        settings = {
+            "downloads.path": str(tmp_path),
+            "downloads.transcode.mode": "webp",
+            "downloads.transcode.webp_quality": 70,
+        }
+        monkeypatch.setattr(manager, "_get_setting_value", lambda key, default: settings.get(key, default))
+        monkeypatch.setattr(manager, "_resolve_scraper", lambda source: FakeScraper(pages))
+        try:
+            await manager._run_download(download_id)
+        finally:
+            await manager.http.aclose()
+            manager.transcoder.shutdown()
+
+    asyncio.run(scenario())
+
+    with Session(memory_engine) as db:
+        download = db.get(Download, download_id)
+        assert download.status == "completed"
+        chapter_dir = Path(download.file_path)
+        stored = sorted(path.name for path in chapter_dir.iterdir())
+        assert stored == ["001.webp", "002.webp"]
+        stored_bytes = sum(path.stat().st_size for path in chapter_dir.iterdir())
+        assert download.bytes_saved == 2 * len(body) - stored_bytes
@@ -1,5 +1,10 @@
+import asyncio
+import json
+import threading
 from pathlib import Path
+from time import time
 
+from app.services.blob_store import BlobStore
 from app.services.image_cache import DiskImageCache
 
 
@@ -62,3 +67,262 @@ def test_image_cache_lru_size_eviction(tmp_path: Path):
     assert cache.get(url="https://example.com/a.jpg", source="s", ttl_hours=24) is None
     assert cache.get(url="https://example.com/b.jpg", source="s", ttl_hours=24) is not None
     assert cache.get(url="https://example.com/c.jpg", source="s", ttl_hours=24) is not None
+
+
+def test_image_cache_index_is_rebuilt_once_and_puts_do_not_scan(tmp_path: Path, monkeypatch):
+    cache = DiskImageCache(tmp_path)
+    for name in ("a", "b", "c"):
+        cache.put(
+            url=f"https://example.com/{name}.jpg",
+            source="s",
+            content=name.encode() * 8,
+            content_type="image/jpeg",
+            max_bytes=1024,
+            ttl_hours=24,
+        )
+    assert cache.get(url="https://example.com/a.jpg", source="s", ttl_hours=24) is not None
+    cache.flush()
+
+    globs = 0
+    original_glob = Path.glob
+
+    def counting_glob(self, pattern):
+        nonlocal globs
+        globs += 1
+        return original_glob(self, pattern)
+
+    monkeypatch.setattr(Path, "glob", counting_glob)
+
+    # A fresh instance, as after a restart, picks the order up from disk.
+    restarted = DiskImageCache(tmp_path)
+    assert restarted.total_size == 24
+    for name in ("d", "e"):
+        restarted.put(
+            url=f"https://example.com/{name}.jpg",
+            source="s",
+            content=name.encode() * 8,
+            content_type="image/jpeg",
+            max_bytes=32,
+            ttl_hours=24,
+        )
+
+    assert globs == 1
+    assert restarted.total_size == 32
+    # b was least recently used; a was read after it was written.
+    assert restarted.get(url="https://example.com/b.jpg", source="s", ttl_hours=24) is None
+    assert restarted.get(url="https://example.com/a.jpg", source="s", ttl_hours=24) is not None
+
+
+def test_image_cache_hits_do_not_write_until_flushed(tmp_path: Path, monkeypatch):
+    cache = DiskImageCache(tmp_path)
+    cache.put(
+        url="https://example.com/a.jpg",
+        source="s",
+        content=b"a" * 8,
+        content_type="image/jpeg",
+        max_bytes=1024,
+        ttl_hours=24,
+    )
+
+    writes = 0
+    original_write_text = Path.write_text
+
+    def counting_write_text(self, *args, **kwargs):
+        nonlocal writes
+        writes += 1
+        return original_write_text(self, *args, **kwargs)
+
+    monkeypatch.setattr(Path, "write_text", counting_write_text)
+
+    for _ in range(5):
+        assert cache.get(url="https://example.com/a.jpg", source="s", ttl_hours=24) is not None
+    assert writes == 0
+
+    cache.flush()
+    assert writes == 1
+    restarted = DiskImageCache(tmp_path)
+    assert list(restarted._entries().values()) == list(cache._entries().values())
+
+
+def test_image_cache_serves_recent_images_from_memory(tmp_path: Path, monkeypatch):
+    cache = DiskImageCache(tmp_path)
+    for name in ("a", "b", "c"):
+        cache.put(
+            url=f"https://example.com/{name}.jpg",
+            source="s",
+            content=name.encode() * 8,
+            content_type="image/jpeg",
+            max_bytes=1024,
+            ttl_hours=24,
+            memory_max_bytes=16,
+        )
+    assert cache.memory_size == 16
+
+    reads = 0
+    original_read_bytes = Path.read_bytes
+
+    def counting_read_bytes(self):
+        nonlocal reads
+        reads += 1
+        return original_read_bytes(self)
+
+    monkeypatch.setattr(Path, "read_bytes", counting_read_bytes)
+
+    def get(name: str):
+        return cache.get(url=f"https://example.com/{name}.jpg", source="s", ttl_hours=24, memory_max_bytes=16)
+
+    for _ in range(3):
+        assert get("b").content == b"b" * 8
+        assert get("c").content == b"c" * 8
+    assert reads == 0
+
+    # a fell out of memory but is still on disk; reading it pushes b out.
+    assert get("a").content == b"a" * 8
+    assert reads == 1
+    assert get("c") is not None and reads == 1
+    assert get("b") is not None and reads == 2
+
+
+def test_image_cache_async_api_evicts_in_the_background(tmp_path: Path):
+    async def scenario():
+        cache = DiskImageCache(tmp_path)
+        await cache.start()
+        try:
+            for name in ("a", "b", "c"):
+                await cache.aput(
+                    url=f"https://example.com/{name}.jpg",
+                    source="s",
+                    content=name.encode() * 8,
+                    content_type="image/jpeg",
+                    max_bytes=16,
+                    ttl_hours=24,
+                )
+            for _ in range(100):
+                if cache.total_size <= 16:
+                    break
+                await asyncio.sleep(0.01)
+
+            assert cache.total_size == 16
+            assert await cache.aget(url="https://example.com/a.jpg", source="s", ttl_hours=24) is None
+            cached = await cache.aget(url="https://example.com/c.jpg", source="s", ttl_hours=24)
+            assert cached is not None and cached.content == b"c" * 8
+        finally:
+            await cache.stop()
+        data_path, _ = cache._paths_for_key(cache._cache_key("https://example.com/a.jpg", "s"))
+        assert not data_path.exists()
+
+    asyncio.run(scenario())
+
+
+def test_image_cache_migrates_flat_entries_into_shards(tmp_path: Path):
+    cache = DiskImageCache(tmp_path)
+    keys = {name: cache._cache_key(f"https://example.com/{name}.jpg", "s") for name in ("a", "b")}
+    for offset, (name, key) in enumerate(keys.items()):
+        (tmp_path / f"{key}.bin").write_bytes(name.encode() * 8)
+        (tmp_path / f"{key}.json").write_text(
+            json.dumps({"created_at": time() - 10, "last_accessed": time() - 10 + offset, "content_type": "image/png"}),
+            encoding="utf-8",
+        )
+    (tmp_path / f"{'f' * 64}.bin").write_bytes(b"orphan")
+
+    # Until the maintenance pass moves them, old entries read as misses.
+    assert cache.get(url="https://example.com/a.jpg", source="s", ttl_hours=24) is None
+    cache.put(
+        url="https://example.com/b.jpg",
+        source="s",
+        content=b"B" * 8,
+        content_type="image/jpeg",
+        max_bytes=1024,
+        ttl_hours=24,
+    )
+
+    cached = cache.get(url="https://example.com/a.jpg", source="s", ttl_hours=24)
+    assert cached is not None and cached.content_type == "image/png"
+    data_path, meta_path = cache._paths_for_key(keys["a"])
+    assert data_path.parent == tmp_path / keys["a"][:2] / keys["a"][2:4]
+    assert data_path.exists() and meta_path.exists()
+    # The copy stored since startup wins over the flat one.
+    assert cache.get(url="https://example.com/b.jpg", source="s", ttl_hours=24).content == b"B" * 8
+    assert sorted(path.name for path in tmp_path.iterdir() if path.is_file()) == [".sharded"]
+    assert not (tmp_path / "ff").exists()
+    assert cache.total_size == 16
+
+
+def test_image_cache_loads_the_index_without_stalling_the_loop(tmp_path: Path, monkeypatch):
+    cache = DiskImageCache(tmp_path)
+    cache.put(
+        url="https://example.com/a.jpg",
+        source="s",
+        content=b"a" * 8,
+        content_type="image/jpeg",
+        max_bytes=1024,
+        ttl_hours=24,
+    )
+    restarted = DiskImageCache(tmp_path)
+    scanning = threading.Event()
+    release = threading.Event()
+    original_scan = DiskImageCache._scan_index
+
+    def slow_scan(self):
+        scanning.set()
+        release.wait(5)
+        return original_scan(self)
+
+    monkeypatch.setattr(DiskImageCache, "_scan_index", slow_scan)
+
+    async def scenario():
+        loading = asyncio.create_task(asyncio.to_thread(restarted.evict, max_bytes=1024, ttl_hours=24))
+        await asyncio.to_thread(scanning.wait, 5)
+        lookup = asyncio.create_task(
+            restarted.aget(url="https://example.com/a.jpg", source="s", ttl_hours=24)
+        )
+        # The loop keeps running while the index is being read.
+        ticks = 0
+        for _ in range(5):
+            await asyncio.sleep(0.01)
+            ticks += 1
+        assert not lookup.done()
+        release.set()
+        await loading
+        return ticks, await lookup
+
+    ticks, cached = asyncio.run(scenario())
+
+    assert ticks == 5
+    assert cached is not None and cached.content == b"a" * 8
+
+
+def test_image_cache_checks_blob_links_outside_the_index_lock(tmp_path: Path, monkeypatch):
+    store = BlobStore(tmp_path / "blobs")
+    cache = DiskImageCache(tmp_path / "cache", blobs=store)
+    original_references = BlobStore.references
+    held = []
+
+    def probe():
+        # Another thread can take the lock only if the caller does not hold it.
+        if cache._lock.acquire(timeout=0.5):
+            cache._lock.release()
+            held.append(False)
+        else:
+            held.append(True)
+
+    def references(self, path):
+        thread = threading.Thread(target=probe)
+        thread.start()
+        thread.join()
+        return original_references(self, path)
+
+    monkeypatch.setattr(BlobStore, "references", references)
+    for name in ("a", "b", "c"):
+        cache.put(
+            url=f"https://example.com/{name}.jpg",
+            source="s",
+            content=name.encode() * 8,
+            content_type="image/jpeg",
+            max_bytes=16,
+            ttl_hours=24,
+        )
+    cache.evict(max_bytes=16, ttl_hours=24)
+
+    assert held and not any(held)
+    assert cache.total_size == 16
@@ -1,7 +1,14 @@
 import React from 'react';
 import { useMutation, useQuery, useQueryClient } from '@tanstack/react-query';
 import { Box, Typography, Paper, LinearProgress, Button, Chip, Stack, Alert } from '@mui/material';
-import { cancelDownload, deleteDownloadFiles, getDownloads, pauseDownload, resumeDownload } from '../../lib/api';
+import {
+  cancelDownload,
+  deleteDownloadFiles,
+  getDownloads,
+  pauseDownload,
+  resumeDownload,
+  subscribeDownloadEvents,
+} from '../../lib/api';
 import { DownloadItem } from '../../types';
 
 export default function DownloadsPage() {
@@ -9,9 +16,25 @@ export default function DownloadsPage() {
   const { data = [], isLoading } = useQuery({
     queryKey: ['downloads'],
     queryFn: getDownloads,
-    refetchInterval: 1500,
+    // Live updates arrive over the event stream; this only catches anything missed.
+    refetchInterval: 30000,
   });
 
+  React.useEffect(
+    () =>
+      subscribeDownloadEvents((event) => {
+        if (event.type === 'queued' || event.type === 'deleted') {
+          queryClient.invalidateQueries({ queryKey: ['downloads'] });
+          return;
+        }
+        const { type: _type, id, ...changes } = event;
+        queryClient.setQueryData<DownloadItem[]>(['downloads'], (current) =>
+          current?.map((item) => (item.id === id ? { ...item, ...changes } : item)),
+        );
+      }),
+    [queryClient],
+  );
+
   const mutateAndRefresh = async (fn: () => Promise<void>) => {
     await fn();
     queryClient.invalidateQueries({ queryKey: ['downloads'] });
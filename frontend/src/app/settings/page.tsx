@@ -23,6 +23,7 @@ export default function SettingsPage() {
   const [readerDirection, setReaderDirection] = useState('ltr');
   const [cacheEnabled, setCacheEnabled] = useState('true');
   const [cacheMaxBytes, setCacheMaxBytes] = useState('536870912');
+  const [cacheMemoryMaxBytes, setCacheMemoryMaxBytes] = useState('67108864');
   const [cacheTtlHours, setCacheTtlHours] = useState('720');
 
   useEffect(() => {
@@ -34,6 +35,7 @@ export default function SettingsPage() {
     setReaderDirection(String(data['reader.reading_direction'] ?? 'ltr'));
     setCacheEnabled(String(data['images.cache.enabled'] ?? true));
     setCacheMaxBytes(String(data['images.cache.max_bytes'] ?? 536870912));
+    setCacheMemoryMaxBytes(String(data['images.cache.memory_max_bytes'] ?? 67108864));
     setCacheTtlHours(String(data['images.cache.ttl_hours'] ?? 720));
   }, [data]);
 
@@ -50,6 +52,7 @@ export default function SettingsPage() {
         updateAppSetting('reader.reading_direction', readerDirection),
         updateAppSetting('images.cache.enabled', cacheEnabled === 'true'),
         updateAppSetting('images.cache.max_bytes', Number(cacheMaxBytes)),
+        updateAppSetting('images.cache.memory_max_bytes', Number(cacheMemoryMaxBytes)),
         updateAppSetting('images.cache.ttl_hours', Number(cacheTtlHours)),
       ]);
     },
@@ -127,6 +130,13 @@ export default function SettingsPage() {
               onChange={(e) => setCacheMaxBytes(e.target.value)}
               inputProps={{ min: 0 }}
             />
+            <TextField
+              label="Image Memory Cache Max Bytes"
+              type="number"
+              value={cacheMemoryMaxBytes}
+              onChange={(e) => setCacheMemoryMaxBytes(e.target.value)}
+              inputProps={{ min: 0 }}
+            />
             <TextField
               label="Image Cache TTL (hours)"
               type="number"
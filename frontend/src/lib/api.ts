@@ -6,6 +6,7 @@ import {
     ReadingProgress,
     HistoryEntry,
     DownloadItem,
+    DownloadPriority,
     UpdateItem,
     LibraryAddResponse,
 } from '../types';
@@ -177,16 +178,45 @@ export const queueDownload = async (payload: {
     chapter_number: number;
     chapter_url: string;
     chapter_title?: string;
+    priority?: DownloadPriority;
 }) => {
     const response = await api.post('/downloads/queue', payload);
     return response.data;
 };
 
+export const queueDownloadsBulk = async (payload: {
+    manga_title: string;
+    manga_url: string;
+    source: string;
+    chapters?: { chapter_number: number; chapter_url: string; chapter_title?: string }[];
+    start_chapter?: number;
+    end_chapter?: number;
+    priority?: DownloadPriority;
+}) => {
+    const response = await api.post('/downloads/queue/bulk', payload);
+    return response.data;
+};
+
 export const getDownloads = async (): Promise<DownloadItem[]> => {
     const response = await api.get('/downloads');
     return response.data.downloads;
 };
 
+export type DownloadEvent = Partial<DownloadItem> & {
+    type: 'queued' | 'progress' | 'status' | 'deleted';
+    id: number;
+};
+
+export const subscribeDownloadEvents = (onEvent: (event: DownloadEvent) => void): (() => void) => {
+    if (typeof EventSource === 'undefined' || !api.defaults.baseURL) {
+        return () => undefined;
+    }
+    const source = new EventSource(`${api.defaults.baseURL}/downloads/events`);
+    const handler = (message: MessageEvent) => onEvent(JSON.parse(message.data));
+    ['queued', 'progress', 'status', 'deleted'].forEach((type) => source.addEventListener(type, handler));
+    return () => source.close();
+};
+
 export const pauseDownload = async (downloadId: number) => {
     await api.post(`/downloads/${downloadId}/pause`);
 };
@@ -203,6 +233,11 @@ export const deleteDownloadFiles = async (downloadId: number) => {
     await api.delete(`/downloads/${downloadId}/files`);
 };
 
+export const deleteDownloadsBulk = async (payload: { download_ids?: number[]; manga_id?: number }) => {
+    const response = await api.post('/downloads/delete', payload);
+    return response.data as { ok: boolean; deleted: number[] };
+};
+
 export const checkUpdates = async () => {
     const response = await api.post('/updates/check');
     return response.data;
@@ -55,6 +55,8 @@ export interface HistoryEntry {
   };
 }
 
+export type DownloadPriority = 'interactive' | 'normal' | 'background';
+
 export interface DownloadItem {
   id: number;
   manga_id: number;
@@ -64,11 +66,14 @@ export interface DownloadItem {
   chapter_url?: string | null;
   source?: string | null;
   status: 'pending' | 'downloading' | 'paused' | 'completed' | 'failed' | 'cancelled';
+  priority: DownloadPriority;
   progress: number;
   error?: string | null;
   file_path?: string | null;
   total_pages: number;
   downloaded_pages: number;
+  failed_pages?: number[];
+  bytes_saved?: number;
   created_at: string;
   updated_at: string;
 }